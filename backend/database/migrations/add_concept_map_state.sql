@@ -0,0 +1,37 @@
+-- Migration: Incremental concept-map rebuilds
+-- Created: 2026-10-19
+-- Purpose: Let create_concept_map.py re-score only changed codes and leave
+--          verified and externally created mappings alone
+
+-- =====================================================
+-- Column: concept_mappings.provenance
+-- Which generator produced a mapping: 'rule', 'keyword', 'fuzzy'
+-- (create_concept_map.py), 'who' (extract_who_mappings.py). Semantic candidates
+-- are kept apart (add_concept_mapping_candidates.sql). Rows from before
+-- this migration, and rows inserted without one (seed.js), are 'legacy': the
+-- next create_concept_map.py run re-scores every code and converts the
+-- unverified ones to its own provenance or deletes them.
+-- =====================================================
+ALTER TABLE concept_mappings ADD COLUMN IF NOT EXISTS provenance VARCHAR(20) DEFAULT 'legacy';
+UPDATE concept_mappings SET provenance = 'legacy' WHERE provenance IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_concept_mappings_provenance ON concept_mappings(provenance);
+
+-- =====================================================
+-- Table: concept_map_state
+-- Content hash of every input the last concept-map run scored, so the next
+-- run only re-scores what changed
+--   source 'namaste': key is the code id, hash covers code + display,
+--     result is the ICD-11 code id it was mapped to
+--   source 'config': key 'scorer', hash covers the rule file, every ICD-11
+--     code and title, the embeddings and the scorer settings; when it changes
+--     every code is re-scored
+-- =====================================================
+CREATE TABLE IF NOT EXISTS concept_map_state (
+    source VARCHAR(20) NOT NULL,
+    key VARCHAR(64) NOT NULL,
+    content_hash CHAR(40) NOT NULL,
+    result VARCHAR(64),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (source, key)
+);
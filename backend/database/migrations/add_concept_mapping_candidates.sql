@@ -0,0 +1,22 @@
+-- Migration: Semantic mapping candidates
+-- Created: 2026-10-19
+-- Purpose: Keep the embedding-based proposals of create_concept_map.py out of
+--          concept_mappings until someone reviews them
+
+-- =====================================================
+-- Table: concept_mapping_candidates
+-- Nearest ICD-11 codes of each NAMASTE code by embedding similarity, ranked
+-- from 1; replaced for every code a concept-map run re-scores
+-- =====================================================
+CREATE TABLE IF NOT EXISTS concept_mapping_candidates (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    namaste_code_id UUID REFERENCES namaste_codes(id) ON DELETE CASCADE,
+    icd11_code_id UUID REFERENCES icd11_codes(id) ON DELETE CASCADE,
+    similarity DECIMAL(3,2) CHECK (similarity >= -1 AND similarity <= 1),
+    rank SMALLINT NOT NULL,
+    provenance VARCHAR(20) DEFAULT 'semantic',
+    created_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE(namaste_code_id, icd11_code_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_concept_mapping_candidates_namaste ON concept_mapping_candidates(namaste_code_id);
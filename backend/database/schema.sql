@@ -47,6 +47,29 @@ CREATE TABLE IF NOT EXISTS concept_mappings (
     verified BOOLEAN DEFAULT FALSE,
     verified_by UUID,
     verified_at TIMESTAMP,
+    provenance VARCHAR(20) DEFAULT 'legacy',
+    created_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE(namaste_code_id, icd11_code_id)
+);
+
+-- Content hashes from the last concept-map run (see create_concept_map.py)
+CREATE TABLE IF NOT EXISTS concept_map_state (
+    source VARCHAR(20) NOT NULL,
+    key VARCHAR(64) NOT NULL,
+    content_hash CHAR(40) NOT NULL,
+    result VARCHAR(64),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (source, key)
+);
+
+-- Semantic (embedding) candidates awaiting review; not concept mappings yet
+CREATE TABLE IF NOT EXISTS concept_mapping_candidates (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    namaste_code_id UUID REFERENCES namaste_codes(id) ON DELETE CASCADE,
+    icd11_code_id UUID REFERENCES icd11_codes(id) ON DELETE CASCADE,
+    similarity DECIMAL(3,2) CHECK (similarity >= -1 AND similarity <= 1),
+    rank SMALLINT NOT NULL,
+    provenance VARCHAR(20) DEFAULT 'semantic',
     created_at TIMESTAMP DEFAULT NOW(),
     UNIQUE(namaste_code_id, icd11_code_id)
 );
@@ -163,6 +186,10 @@ CREATE INDEX IF NOT EXISTS idx_icd11_title ON icd11_codes USING gin(to_tsvector(
 
 CREATE INDEX IF NOT EXISTS idx_concept_mappings_namaste ON concept_mappings(namaste_code_id);
 CREATE INDEX IF NOT EXISTS idx_concept_mappings_icd11 ON concept_mappings(icd11_code_id);
+-- concept_mappings tables created before provenance was tracked don't have the column
+ALTER TABLE concept_mappings ADD COLUMN IF NOT EXISTS provenance VARCHAR(20) DEFAULT 'legacy';
+CREATE INDEX IF NOT EXISTS idx_concept_mappings_provenance ON concept_mappings(provenance);
+CREATE INDEX IF NOT EXISTS idx_concept_mapping_candidates_namaste ON concept_mapping_candidates(namaste_code_id);
 
 CREATE INDEX IF NOT EXISTS idx_patient_treatments_patient ON patient_treatments(patient_id);
 CREATE INDEX IF NOT EXISTS idx_patient_treatments_doctor ON patient_treatments(doctor_id);
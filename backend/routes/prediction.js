@@ -5,6 +5,8 @@ import db from '../database/db.js';
 
 const router = express.Router();
 const ML_SERVICE_URL = 'http://localhost:5001';
+// Upper bound on how long a prediction may take, passed to the ML service as its deadline
+const ML_PREDICT_TIMEOUT_MS = parseInt(process.env.ML_PREDICT_TIMEOUT_MS || '5000', 10);
 
 /**
  * GET /api/prediction/symptoms
@@ -12,7 +14,20 @@ const ML_SERVICE_URL = 'http://localhost:5001';
  */
 router.get('/symptoms', optionalAuth, async (req, res) => {
     try {
-        const response = await axios.get(`${ML_SERVICE_URL}/symptoms`);
+        // Revalidate with the ML service's ETag so unchanged lists come back as 304
+        const ifNoneMatch = req.headers['if-none-match'];
+        const response = await axios.get(`${ML_SERVICE_URL}/symptoms`, {
+            headers: ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {},
+            validateStatus: (status) => status === 200 || status === 304
+        });
+
+        if (response.headers.etag) {
+            res.set('ETag', response.headers.etag);
+            res.set('Cache-Control', 'no-cache');
+        }
+        if (response.status === 304) {
+            return res.status(304).end();
+        }
         res.json(response.data);
     } catch (error) {
         console.error('Error fetching symptoms:', error.message);
@@ -23,6 +38,93 @@ router.get('/symptoms', optionalAuth, async (req, res) => {
     }
 });
 
+/**
+ * GET /api/prediction/symptoms/suggest?q=
+ * Ranked symptom suggestions as the user types
+ */
+router.get('/symptoms/suggest', optionalAuth, async (req, res) => {
+    try {
+        const { q = '', limit = 10 } = req.query;
+        const response = await axios.get(`${ML_SERVICE_URL}/symptoms/suggest`, {
+            params: { q, limit }
+        });
+        res.json(response.data);
+    } catch (error) {
+        console.error('Error fetching symptom suggestions:', error.message);
+        res.status(503).json({
+            error: 'ML Service Unavailable',
+            message: 'Could not fetch symptom suggestions.'
+        });
+    }
+});
+
+/**
+ * POST /api/prediction/symptoms/next
+ * Symptoms most worth asking about next, given the ones selected so far
+ */
+router.post('/symptoms/next', optionalAuth, async (req, res) => {
+    try {
+        const { symptoms = [], limit } = req.body;
+        const response = await axios.post(`${ML_SERVICE_URL}/symptoms/next`, {
+            symptoms,
+            limit
+        }, {
+            timeout: ML_PREDICT_TIMEOUT_MS,
+            headers: { 'X-Request-Deadline-Ms': String(ML_PREDICT_TIMEOUT_MS) }
+        });
+        res.json(response.data);
+    } catch (error) {
+        console.error('Error fetching next symptoms:', error.message);
+        if (error.response) {
+            // Pass load-shedding hints from the ML service through to the client
+            const retryAfter = error.response.headers['retry-after'];
+            if (retryAfter) {
+                res.set('Retry-After', retryAfter);
+            }
+            res.status(error.response.status).json(error.response.data);
+        } else {
+            res.status(503).json({
+                error: 'ML Service Unavailable',
+                message: 'Could not fetch next symptom suggestions.'
+            });
+        }
+    }
+});
+
+/**
+ * POST /api/prediction/cases/similar
+ * Training cases whose symptoms are closest to the given ones
+ */
+router.post('/cases/similar', optionalAuth, async (req, res) => {
+    try {
+        const { symptoms = [], k, metric } = req.body;
+        const response = await axios.post(`${ML_SERVICE_URL}/cases/similar`, {
+            symptoms,
+            k,
+            metric
+        }, {
+            timeout: ML_PREDICT_TIMEOUT_MS,
+            headers: { 'X-Request-Deadline-Ms': String(ML_PREDICT_TIMEOUT_MS) }
+        });
+        res.json(response.data);
+    } catch (error) {
+        console.error('Error fetching similar cases:', error.message);
+        if (error.response) {
+            // Pass load-shedding hints from the ML service through to the client
+            const retryAfter = error.response.headers['retry-after'];
+            if (retryAfter) {
+                res.set('Retry-After', retryAfter);
+            }
+            res.status(error.response.status).json(error.response.data);
+        } else {
+            res.status(503).json({
+                error: 'ML Service Unavailable',
+                message: 'Could not fetch similar cases.'
+            });
+        }
+    }
+});
+
 /**
  * GET /api/prediction/models
  * Get available models info
@@ -59,6 +161,9 @@ router.post('/disease', optionalAuth, async (req, res) => {
         const response = await axios.post(`${ML_SERVICE_URL}/predict`, {
             symptoms,
             model
+        }, {
+            timeout: ML_PREDICT_TIMEOUT_MS,
+            headers: { 'X-Request-Deadline-Ms': String(ML_PREDICT_TIMEOUT_MS) }
         });
 
         // Log prediction if user is authenticated
@@ -95,7 +200,7 @@ router.post('/disease', optionalAuth, async (req, res) => {
                 `, [
                     req.user.id,
                     symptoms,
-                    model || 'random_forest',
+                    model || result.model,
                     predictedDisease,
                     confidence || 0
                 ]);
@@ -132,6 +237,11 @@ router.post('/disease', optionalAuth, async (req, res) => {
     } catch (error) {
         console.error('Prediction error:', error.message);
         if (error.response) {
+            // Pass load-shedding hints from the ML service through to the client
+            const retryAfter = error.response.headers['retry-after'];
+            if (retryAfter) {
+                res.set('Retry-After', retryAfter);
+            }
             res.status(error.response.status).json(error.response.data);
         } else {
             res.status(503).json({
@@ -0,0 +1,123 @@
+"""
+Bulk loading through COPY and a staging table
+Rows are streamed with COPY FROM STDIN into a temporary staging table (never
+WAL-logged, private to the session, dropped on commit), then merged into the
+target with one INSERT ... SELECT ... ON CONFLICT. When a load replaces a slice
+of the target (one system's codes), the rows that disappeared are deleted in
+the same transaction, so readers see either the old or the new release.
+Nothing is committed here; the caller commits when its transaction is done.
+"""
+
+import time
+
+from psycopg2 import sql
+
+# Bytes handed to COPY per read
+COPY_CHUNK_BYTES = 1 << 16
+
+def copy_value(value):
+    """One field in COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (list, tuple)):
+        return '{' + ','.join('NULL' if v is None else str(v) for v in value) + '}'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+class RowStream:
+    """
+    Read-only file object that renders rows as COPY text lines on demand
+    Each line is prefixed with the row's position, so later rows can win
+    over earlier ones with the same key, as they would with row-by-row upserts
+    """
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = b''
+        self.count = 0
+
+    def read(self, size=-1):
+        parts = [self.buffer]
+        length = len(self.buffer)
+        while size < 0 or length < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            line = '\t'.join([str(self.count)] + [copy_value(v) for v in row]) + '\n'
+            self.count += 1
+            encoded = line.encode('utf-8')
+            parts.append(encoded)
+            length += len(encoded)
+        data = b''.join(parts)
+        if size < 0:
+            size = len(data)
+        self.buffer = data[size:]
+        return data[:size]
+
+def merge_rows(cursor, table, columns, rows, key=None, update=(), touch=None, replace_where=None):
+    """
+    Load rows (tuples in columns order) into table
+    key: conflict columns; without one, rows are plain inserts
+    update: columns taken from the new row on a key conflict (none: DO NOTHING)
+    touch: timestamp column set to NOW() when a row is updated
+    replace_where: {column: value} slice of the target being replaced; its rows
+        missing from the new data are deleted (all of them when there is no key)
+    Returns {'rows', 'merged', 'deleted', 'seconds'}
+    """
+    start = time.perf_counter()
+    stage = sql.Identifier(f"stage_{table}")
+    temp_stage = sql.Identifier('pg_temp', f"stage_{table}")
+    target = sql.Identifier(table)
+    column_list = sql.SQL(', ').join(sql.Identifier(c) for c in columns)
+
+    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(temp_stage))
+    cursor.execute(sql.SQL(
+        "CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT 0::bigint AS stage_row, {} FROM {} WITH NO DATA"
+    ).format(stage, column_list, target))
+
+    stream = RowStream(rows)
+    cursor.copy_expert(
+        sql.SQL("COPY {} (stage_row, {}) FROM STDIN").format(stage, column_list).as_string(cursor),
+        stream, size=COPY_CHUNK_BYTES
+    )
+
+    deleted = 0
+    if replace_where:
+        where = sql.SQL(' AND ').join(
+            sql.SQL("{}.{} = %s").format(target, sql.Identifier(c)) for c in replace_where
+        )
+        if key:
+            matches = sql.SQL(' AND ').join(
+                sql.SQL("s.{0} = {1}.{0}").format(sql.Identifier(c), target) for c in key
+            )
+            where = sql.SQL("{} AND NOT EXISTS (SELECT 1 FROM {} s WHERE {})").format(where, stage, matches)
+        cursor.execute(sql.SQL("DELETE FROM {} WHERE {}").format(target, where), list(replace_where.values()))
+        deleted = cursor.rowcount
+
+    if key:
+        key_list = sql.SQL(', ').join(sql.Identifier(c) for c in key)
+        # Last row per key wins, like a sequence of single-row upserts
+        select = sql.SQL("SELECT DISTINCT ON ({0}) {1} FROM {2} ORDER BY {0}, stage_row DESC").format(
+            key_list, column_list, stage
+        )
+        assignments = [sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in update]
+        if assignments and touch:
+            assignments.append(sql.SQL("{} = NOW()").format(sql.Identifier(touch)))
+        if assignments:
+            conflict = sql.SQL("ON CONFLICT ({}) DO UPDATE SET {}").format(key_list, sql.SQL(', ').join(assignments))
+        else:
+            conflict = sql.SQL("ON CONFLICT ({}) DO NOTHING").format(key_list)
+    else:
+        select = sql.SQL("SELECT {} FROM {} ORDER BY stage_row").format(column_list, stage)
+        conflict = sql.SQL('')
+
+    cursor.execute(sql.SQL("INSERT INTO {} ({}) {} {}").format(target, column_list, select, conflict))
+    merged = cursor.rowcount
+    cursor.execute(sql.SQL("DROP TABLE {}").format(temp_stage))
+
+    seconds = time.perf_counter() - start
+    rate = stream.count / seconds if seconds > 0 else 0
+    print(f"Loaded {stream.count} rows into {table} in {seconds:.2f}s ({rate:,.0f} rows/s)")
+    return {'rows': stream.count, 'merged': merged, 'deleted': deleted, 'seconds': seconds}
@@ -0,0 +1,105 @@
+"""
+Packed-bitset index of training cases for nearest-case retrieval
+Cases are stored word-major: row w of the (words x cases) uint64 matrix holds
+bit w*64..w*64+63 of every case, so scoring a query only streams the few
+contiguous rows where the query has symptoms set. Together with each case's
+precomputed symptom count, one AND + popcount pass gives both Jaccard and
+Hamming scores.
+"""
+
+import numpy as np
+
+# Cases scored per pass; bounds temporary memory for very large case sets
+BLOCK_CASES = 1 << 20
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        """Number of set bits in each uint64"""
+        return np.bitwise_count(words)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Number of set bits in each uint64"""
+        as_bytes = np.ascontiguousarray(words).view(np.uint8).reshape(-1, 8)
+        return _BYTE_POPCOUNT[as_bytes].sum(axis=1, dtype=np.uint8)
+
+def words_per_row(n_columns):
+    return (n_columns + 63) // 64
+
+def pack_bitsets(binary_matrix):
+    """Pack a 0/1 (rows x columns) matrix into (rows x words) little-endian uint64 bitsets"""
+    binary_matrix = np.asarray(binary_matrix) > 0
+    n_rows, n_columns = binary_matrix.shape
+    packed = np.packbits(binary_matrix, axis=1, bitorder='little')
+
+    # Pad each row to a whole number of 64-bit words
+    padded = np.zeros((n_rows, words_per_row(n_columns) * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view('<u8')
+
+def build_case_index(binary_matrix):
+    """Word-major (words x cases) bitsets and per-case symptom counts for a 0/1 case matrix"""
+    case_bits = np.ascontiguousarray(pack_bitsets(binary_matrix).T)
+    case_counts = (np.asarray(binary_matrix) > 0).sum(axis=1).astype(np.uint16)
+    return case_bits, case_counts
+
+def pack_indices(indices, n_columns):
+    """Bitset for a single query given its set column indices"""
+    row = np.zeros((1, n_columns), dtype=bool)
+    row[0, list(indices)] = True
+    return pack_bitsets(row)[0]
+
+def case_indices(case_bits, case_id, n_columns):
+    """Column indices set for one stored case"""
+    words = np.ascontiguousarray(case_bits[:, case_id]).astype('<u8')
+    bits = np.unpackbits(words.view(np.uint8), bitorder='little')
+    return np.flatnonzero(bits[:n_columns])
+
+def nearest_cases(case_bits, case_counts, query, k=5, metric='jaccard'):
+    """
+    Top-k stored cases closest to a packed query
+    metric='jaccard' ranks by shared / union symptom counts (higher is closer);
+    metric='hamming' ranks by the number of differing symptoms (lower is closer).
+    Returns (case indices, scores, shared symptom counts), best first.
+    """
+    n_cases = case_bits.shape[1]
+    query_words = [w for w in range(len(query)) if query[w]]
+    query_count = int(popcount(query).sum())
+
+    best_index = np.empty(0, dtype=np.int64)
+    best_score = np.empty(0, dtype=np.float64)
+    best_shared = np.empty(0, dtype=np.int64)
+
+    for start in range(0, n_cases, BLOCK_CASES):
+        end = min(start + BLOCK_CASES, n_cases)
+        shared = np.zeros(end - start, dtype=np.uint16)
+        for w in query_words:
+            shared += popcount(case_bits[w, start:end] & query[w])
+
+        union = case_counts[start:end].astype(np.int64) + query_count - shared
+        if metric == 'hamming':
+            # Negate distances so larger is always better while merging
+            score = -(union - shared).astype(np.float64)
+        else:
+            score = np.divide(shared, union, out=np.zeros(end - start), where=union > 0)
+
+        # Keep only this block's top-k before merging with the running best
+        if len(score) > k:
+            top = np.argpartition(-score, k - 1)[:k]
+        else:
+            top = np.arange(len(score))
+        best_index = np.concatenate([best_index, top + start])
+        best_score = np.concatenate([best_score, score[top]])
+        best_shared = np.concatenate([best_shared, shared[top]])
+
+        if len(best_score) > k:
+            keep = np.argpartition(-best_score, k - 1)[:k]
+            best_index, best_score, best_shared = best_index[keep], best_score[keep], best_shared[keep]
+
+    # Best first; equal scores are listed in case order
+    order = np.lexsort((best_index, -best_score))
+    scores = best_score[order]
+    if metric == 'hamming':
+        scores = -scores
+    return best_index[order], scores, best_shared[order]
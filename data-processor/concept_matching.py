@@ -0,0 +1,303 @@
+"""
+Matching engines used by create_concept_map.py to map NAMASTE terms to ICD-11 codes
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+# Minimum keyword overlap score for a keyword match
+KEYWORD_THRESHOLD = 0.3
+
+# Curated term -> ICD-11 rules, maintained outside the code
+RULES_FILE = Path(os.getenv('MAPPING_RULES_FILE', Path(__file__).parent / 'mapping_rules.json'))
+
+# Embedding matrices written by semantic_search.py (next to embeddings.json)
+EMBEDDINGS_DIR = Path(os.getenv('EMBEDDINGS_DIR', '.'))
+
+# Semantic neighbours kept per NAMASTE code, and the cosine similarity they need
+SEMANTIC_TOP_K = int(os.getenv('SEMANTIC_TOP_K', '3'))
+SEMANTIC_MIN_SIMILARITY = float(os.getenv('SEMANTIC_MIN_SIMILARITY', '0.8'))
+
+# Rows and columns of the similarity matrix computed per block
+SEMANTIC_BLOCK_ROWS = 1024
+SEMANTIC_BLOCK_COLS = 16384
+
+def normalize_text(text):
+    """Lowercase, strip diacritics (jvaraḥ -> jvarah) and collapse whitespace"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r'\s+', ' ', stripped.lower()).strip()
+
+def title_tokens(text):
+    """Distinct lowercase whitespace-separated words"""
+    return set(text.lower().split())
+
+class KeywordIndex:
+    """
+    Inverted index from title word to ICD-11 code positions
+    Every title is tokenized once; a query only touches the codes that share at
+    least one word with it, and their overlap counts come from one np.unique.
+    Scores match the original pairwise scorer exactly: shared words divided by
+    the larger word count, ties going to the earliest code in list order.
+    """
+
+    def __init__(self, icd11_codes):
+        self.codes = [c['code'] for c in icd11_codes]
+        postings = {}
+        sizes = []
+        for position, icd11 in enumerate(icd11_codes):
+            words = title_tokens(icd11['title'])
+            sizes.append(len(words))
+            for word in words:
+                postings.setdefault(word, []).append(position)
+        self.postings = {word: np.asarray(positions, dtype=np.int32) for word, positions in postings.items()}
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def scores(self, display):
+        """Candidate code positions (ascending) and their overlap scores"""
+        words = title_tokens(display)
+        lists = [self.postings[word] for word in words if word in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        candidates, shared = np.unique(np.concatenate(lists), return_counts=True)
+        return candidates, shared / np.maximum(len(words), self.sizes[candidates])
+
+    def best_match(self, display, threshold=KEYWORD_THRESHOLD):
+        """(ICD-11 code, score) of the best-scoring title above threshold, else (None, 0.0)"""
+        candidates, scores = self.scores(display)
+        if not len(candidates):
+            return None, 0.0
+        # argmax returns the first maximum, i.e. the earliest code, like a strict > scan
+        best = int(np.argmax(scores))
+        if scores[best] > threshold:
+            return self.codes[candidates[best]], float(scores[best])
+        return None, 0.0
+
+def load_rules(path=RULES_FILE):
+    """Rules from the rules file, with defaults applied and terms normalized"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    defaults = data.get('defaults', {})
+    rules = []
+    for order, rule in enumerate(data['rules']):
+        term = normalize_text(rule['term'])
+        if not term:
+            raise ValueError(f"Rule {order} in {path} has an empty term")
+        rules.append({
+            'term': term,
+            'icd_code': rule['icd_code'],
+            'priority': rule.get('priority', defaults.get('priority', 0)),
+            'confidence': float(rule.get('confidence', defaults.get('confidence', 0.95))),
+            'order': order
+        })
+    return rules
+
+class RuleMatcher:
+    """
+    Aho-Corasick automaton over every rule term
+    One left-to-right pass over a normalized display finds every rule whose
+    term occurs in it, however many rules there are. When several match, the
+    highest priority wins, then the longest term, then the earliest rule.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        # State 0 is the root; goto[state] maps a character to the next state
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for rule_id, rule in enumerate(self.rules):
+            state = 0
+            for char in rule['term']:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(rule_id)
+
+        # Breadth-first failure links (depth-1 states fall back to the root);
+        # each state also reports the rules of the state it falls back to
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    @classmethod
+    def from_file(cls, path=RULES_FILE):
+        return cls(load_rules(path))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def find_all(self, display):
+        """Every (rule, end offset) whose term occurs in the normalized display"""
+        text = normalize_text(display)
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for rule_id in self.output[state]:
+                matches.append((self.rules[rule_id], position + 1))
+        return matches
+
+    def best_match(self, display):
+        """(ICD-11 code, confidence) of the winning rule, else (None, 0.0)"""
+        matches = self.find_all(display)
+        if not matches:
+            return None, 0.0
+        rule, _ = min(matches, key=lambda match: (-match[0]['priority'], -len(match[0]['term']), match[0]['order']))
+        return rule['icd_code'], rule['confidence']
+
+def embedding_paths(directory=EMBEDDINGS_DIR):
+    directory = Path(directory)
+    return {
+        'namaste': directory / 'embeddings_namaste.npy',
+        'icd11': directory / 'embeddings_icd11.npy',
+        'ids': directory / 'embeddings_ids.json'
+    }
+
+def save_embedding_matrices(namaste_ids, namaste_embeddings, icd11_ids, icd11_embeddings, directory=EMBEDDINGS_DIR):
+    """Store both embedding matrices as float32 .npy files that can be memory-mapped"""
+    paths = embedding_paths(directory)
+    np.save(paths['namaste'], np.asarray(namaste_embeddings, dtype=np.float32))
+    np.save(paths['icd11'], np.asarray(icd11_embeddings, dtype=np.float32))
+    with open(paths['ids'], 'w') as f:
+        json.dump({'namaste': [str(i) for i in namaste_ids], 'icd11': [str(i) for i in icd11_ids]}, f)
+    return paths
+
+def load_embedding_matrices(directory=EMBEDDINGS_DIR):
+    """
+    Memory-mapped NAMASTE and ICD-11 embeddings with their code ids, or None
+    Falls back to converting embeddings.json when the .npy files don't exist yet
+    """
+    paths = embedding_paths(directory)
+    if not all(path.exists() for path in paths.values()):
+        legacy = Path(directory) / 'embeddings.json'
+        if not legacy.exists():
+            return None
+        with open(legacy, 'r') as f:
+            data = json.load(f)
+        save_embedding_matrices(data['namaste']['ids'], data['namaste']['embeddings'],
+                                data['icd11']['ids'], data['icd11']['embeddings'], directory)
+
+    with open(paths['ids'], 'r') as f:
+        ids = json.load(f)
+    return {
+        'namaste_ids': ids['namaste'],
+        'icd11_ids': ids['icd11'],
+        'namaste': np.load(paths['namaste'], mmap_mode='r'),
+        'icd11': np.load(paths['icd11'], mmap_mode='r')
+    }
+
+def embeddings_signature(directory=EMBEDDINGS_DIR):
+    """Content hash of the embedding files, or None when there are none"""
+    paths = embedding_paths(directory)
+    if not all(path.exists() for path in paths.values()):
+        return None
+    digest = hashlib.sha1()
+    for key in ('ids', 'namaste', 'icd11'):
+        with open(paths[key], 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def unit_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+def top_k_similar(queries, corpus, k, query_rows=None,
+                  block_rows=SEMANTIC_BLOCK_ROWS, block_cols=SEMANTIC_BLOCK_COLS):
+    """
+    Top-k cosine neighbours in corpus for each query row, best first
+    The similarity matrix is computed one (block_rows x block_cols) block at a
+    time, keeping a running top-k per row, so memory does not grow with the
+    corpus. query_rows optionally restricts the queries to those row positions.
+    Returns (corpus positions, similarities), both shaped (queries, k)
+    """
+    if query_rows is None:
+        query_rows = np.arange(len(queries))
+    query_rows = np.asarray(query_rows, dtype=np.int64)
+    k = min(k, len(corpus))
+    indices = np.empty((len(query_rows), k), dtype=np.int64)
+    scores = np.empty((len(query_rows), k), dtype=np.float32)
+    if k == 0:
+        return indices, scores
+
+    for row_start in range(0, len(query_rows), block_rows):
+        rows = query_rows[row_start:row_start + block_rows]
+        block = unit_rows(queries[rows])
+        best_idx = np.empty((len(rows), 0), dtype=np.int64)
+        best_score = np.empty((len(rows), 0), dtype=np.float32)
+
+        for col_start in range(0, len(corpus), block_cols):
+            similarity = block @ unit_rows(corpus[col_start:col_start + block_cols]).T
+            kk = min(k, similarity.shape[1])
+            top = np.argpartition(-similarity, kk - 1, axis=1)[:, :kk]
+            best_idx = np.concatenate([best_idx, top + col_start], axis=1)
+            best_score = np.concatenate([best_score, np.take_along_axis(similarity, top, axis=1)], axis=1)
+            if best_idx.shape[1] > k:
+                keep = np.argpartition(-best_score, k - 1, axis=1)[:, :k]
+                best_idx = np.take_along_axis(best_idx, keep, axis=1)
+                best_score = np.take_along_axis(best_score, keep, axis=1)
+
+        # Best first; equal similarities in corpus order
+        order = np.lexsort((best_idx, -best_score), axis=1)
+        end = row_start + len(rows)
+        indices[row_start:end] = np.take_along_axis(best_idx, order, axis=1)
+        scores[row_start:end] = np.take_along_axis(best_score, order, axis=1)
+    return indices, scores
+
+class SemanticMatcher:
+    """Nearest ICD-11 codes for NAMASTE codes by embedding cosine similarity"""
+
+    def __init__(self, embeddings, icd11_codes):
+        self.embeddings = embeddings
+        self.namaste_position = {code_id: i for i, code_id in enumerate(embeddings['namaste_ids'])}
+        # Only ICD-11 codes that still exist can be proposed
+        current = {str(c['id']) for c in icd11_codes}
+        self.icd11_ids = embeddings['icd11_ids']
+        self.icd11_valid = np.array([code_id in current for code_id in self.icd11_ids], dtype=bool)
+
+    @classmethod
+    def from_directory(cls, icd11_codes, directory=EMBEDDINGS_DIR):
+        embeddings = load_embedding_matrices(directory)
+        return cls(embeddings, icd11_codes) if embeddings else None
+
+    def candidates(self, namaste_ids, k=SEMANTIC_TOP_K, min_similarity=SEMANTIC_MIN_SIMILARITY):
+        """{namaste id: [(icd11 id, similarity), ...]} for every id that has embeddings"""
+        ids = [str(i) for i in namaste_ids if str(i) in self.namaste_position]
+        rows = [self.namaste_position[i] for i in ids]
+        indices, scores = top_k_similar(self.embeddings['namaste'], self.embeddings['icd11'], k, rows)
+
+        results = {}
+        for namaste_id, row_indices, row_scores in zip(ids, indices, scores):
+            results[namaste_id] = [
+                (self.icd11_ids[j], float(score))
+                for j, score in zip(row_indices, row_scores)
+                if score >= min_similarity and self.icd11_valid[j]
+            ]
+        return results
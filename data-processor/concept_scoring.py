@@ -0,0 +1,190 @@
+"""
+Rule, keyword and fuzzy scoring of NAMASTE codes against ICD-11 codes
+Shared by create_concept_map.py; has no database dependencies. Codes are
+scored in a process pool over shards (by system and id hash), and the result
+is merged back in NAMASTE code order.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from concept_matching import KeywordIndex, RuleMatcher
+from fuzzy_matcher import FuzzyIndex, fold_transliteration
+
+# Below this many codes a process pool costs more than it saves
+PARALLEL_MIN_CODES = 2000
+
+# Fuzzy matches rank below curated rules of the same strength
+FUZZY_CONFIDENCE_SCALE = 0.9
+
+# Shorter words (of, the) are within a couple of edits of too many others
+FUZZY_MIN_WORD_LENGTH = 4
+
+def find_mapping_by_rule(namaste_display, rule_matcher):
+    """Find ICD-11 code using the curated rules in mapping_rules.json"""
+    return rule_matcher.best_match(namaste_display)
+
+def find_mapping_by_keywords(namaste_display, keyword_index):
+    """Find ICD-11 code using keyword matching against a prebuilt KeywordIndex"""
+    return keyword_index.best_match(namaste_display)
+
+def fuzzy_terms(text):
+    """The text itself and each of its words long enough to compare, once per folded spelling"""
+    terms, seen = [], set()
+    for position, term in enumerate([text] + text.split()):
+        folded = fold_transliteration(term)
+        if folded and folded not in seen and (position == 0 or len(folded) >= FUZZY_MIN_WORD_LENGTH):
+            seen.add(folded)
+            terms.append(term)
+    return terms
+
+def build_fuzzy_index(icd11_codes):
+    """
+    FuzzyIndex over the traditional-medicine (TM2) titles, whole and word by word
+    Only those carry transliterated names; folding English biomedical titles
+    into one letter string only produces noise
+    """
+    terms, codes = [], []
+    for icd11 in icd11_codes:
+        if icd11.get('module') != 'TM2':
+            continue
+        for term in fuzzy_terms(icd11['title']):
+            terms.append(term)
+            codes.append(icd11['code'])
+    return FuzzyIndex(terms, codes)
+
+def find_mapping_by_fuzzy(namaste_display, fuzzy_index):
+    """Find the TM2 code whose title (or a word of it) is a romanization variant of the display (or a word of it)"""
+    best_code, best_similarity = None, 0.0
+    for term in fuzzy_terms(namaste_display):
+        icd_code, similarity = fuzzy_index.best_match(term)
+        if similarity > best_similarity:
+            best_code, best_similarity = icd_code, similarity
+    return best_code, best_similarity * FUZZY_CONFIDENCE_SCALE
+
+def map_code(namaste_display, rule_matcher, keyword_index, fuzzy_index):
+    """Best ICD-11 code for one display as (code, confidence, provenance)"""
+    # Try manual rule first
+    icd_code, confidence = find_mapping_by_rule(namaste_display, rule_matcher)
+    if icd_code:
+        return icd_code, confidence, 'rule'
+
+    # If no manual rule, try keyword matching
+    icd_code, confidence = find_mapping_by_keywords(namaste_display, keyword_index)
+    if icd_code:
+        return icd_code, confidence, 'keyword'
+
+    # Spelling variants (jwara / jvara) share no words; compare the spellings
+    icd_code, confidence = find_mapping_by_fuzzy(namaste_display, fuzzy_index)
+    return icd_code, confidence, 'fuzzy'
+
+# Read-only matchers for the scoring workers, inherited through fork
+_worker_index = {}
+
+def init_worker(rule_matcher, keyword_index, fuzzy_index):
+    _worker_index['rule'] = rule_matcher
+    _worker_index['keyword'] = keyword_index
+    _worker_index['fuzzy'] = fuzzy_index
+
+def score_shard(shard):
+    """(namaste id, ICD-11 code, confidence, provenance) for every code in the shard that maps"""
+    rule_matcher, keyword_index, fuzzy_index = _worker_index['rule'], _worker_index['keyword'], _worker_index['fuzzy']
+    scored = []
+    for namaste_id, display in shard:
+        icd_code, confidence, provenance = map_code(display, rule_matcher, keyword_index, fuzzy_index)
+        if icd_code:
+            scored.append((namaste_id, icd_code, confidence, provenance))
+    return len(shard), scored
+
+def pool_context():
+    """Prefer fork so workers share the matchers instead of unpickling a copy"""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+def shard_codes(namaste_codes, shards_per_system=1):
+    """
+    Split codes by system_type, then by a stable hash of the id into
+    shards_per_system ranges; returns {(system_type, range): [(id, display), ...]}
+    """
+    shards = {}
+    for namaste in namaste_codes:
+        bucket = int(hashlib.md5(str(namaste['id']).encode('utf-8')).hexdigest(), 16) % shards_per_system
+        shards.setdefault((namaste['system_type'], bucket), []).append((namaste['id'], namaste['display']))
+    return shards
+
+def create_mappings(namaste_codes, icd11_codes, only_ids=None, workers=None):
+    """
+    Create concept mappings, for every NAMASTE code or just the ids in only_ids
+    Shards are scored in a fork-based process pool when workers > 1; the result
+    is merged back in NAMASTE code order, so it does not depend on worker timing
+    """
+    print("Creating concept mappings...")
+
+    rule_matcher = RuleMatcher.from_file()
+    print(f"Loaded {len(rule_matcher)} mapping rules")
+
+    # Tokenize every ICD-11 title once instead of once per NAMASTE code
+    keyword_index = KeywordIndex(icd11_codes)
+    fuzzy_index = build_fuzzy_index(icd11_codes)
+    icd11_by_code = {}
+    for icd11 in icd11_codes:
+        icd11_by_code.setdefault(icd11['code'], icd11)
+
+    selected = [n for n in namaste_codes if only_ids is None or n['id'] in only_ids]
+    workers = workers or os.cpu_count() or 1
+    if len(selected) < PARALLEL_MIN_CODES:
+        workers = 1
+    systems = len({n['system_type'] for n in selected}) or 1
+    # A few shards per worker keep the pool busy when systems differ in size
+    shards = shard_codes(selected, max(1, -(-workers * 4 // systems)))
+
+    start = time.perf_counter()
+    scored = {}
+    done, mapped = 0, 0
+
+    def record(result):
+        nonlocal done, mapped
+        count, rows = result
+        done += count
+        mapped += len(rows)
+        for row in rows:
+            scored[row[0]] = row
+        print(f"  Scored {done}/{len(selected)} codes, {mapped} mapped")
+
+    if workers == 1:
+        init_worker(rule_matcher, keyword_index, fuzzy_index)
+        for key in sorted(shards, key=str):
+            record(score_shard(shards[key]))
+    else:
+        print(f"Scoring {len(shards)} shards with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(), initializer=init_worker,
+                                 initargs=(rule_matcher, keyword_index, fuzzy_index)) as pool:
+            futures = [pool.submit(score_shard, shard) for shard in shards.values()]
+            for future in as_completed(futures):
+                record(future.result())
+    print(f"Scored {len(selected)} codes in {time.perf_counter() - start:.2f}s")
+
+    mappings = []
+    for namaste in selected:
+        if namaste['id'] not in scored:
+            continue
+        _, icd_code, confidence, provenance = scored[namaste['id']]
+        # Find ICD-11 ID
+        icd11_match = icd11_by_code.get(icd_code)
+
+        if icd11_match:
+            mappings.append({
+                'namaste_id': namaste['id'],
+                'icd11_id': icd11_match['id'],
+                'mapping_type': 'equivalent',
+                'confidence': round(confidence, 2),
+                'provenance': provenance,
+                'namaste_display': namaste['display'],
+                'icd11_title': icd11_match['title']
+            })
+
+    return mappings
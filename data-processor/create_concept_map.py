@@ -1,38 +1,44 @@
 """
 Create concept mappings between NAMASTE and ICD-11 codes
-Uses manual rules and basic string matching
+Uses manual rules, basic string matching and transliteration-aware fuzzy matching
+
+Runs are incremental: content hashes saved by the previous run decide which
+NAMASTE codes need re-scoring, and only the resulting differences are written.
+Verified mappings and mappings from other generators are never modified;
+unverified mappings from before provenance was recorded are taken over on the
+first run. Pass --full to re-score every code.
+
+When semantic_search.py has written embeddings, a semantic stage also proposes
+the nearest ICD-11 codes of every NAMASTE code for review; they are kept in
+concept_mapping_candidates, not concept_mappings. Pass --no-semantic to skip it.
+
+Rule, keyword and fuzzy scoring (concept_scoring.py) runs in a process pool
+over shards of the NAMASTE codes; --workers sets its size.
 """
 
 import psycopg2
 from psycopg2.extras import execute_values
+import argparse
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
+from bulk_loader import merge_rows
+from concept_matching import (
+    KEYWORD_THRESHOLD, RULES_FILE, SEMANTIC_TOP_K, SEMANTIC_MIN_SIMILARITY, SemanticMatcher, embeddings_signature
+)
+from concept_scoring import FUZZY_MIN_WORD_LENGTH, create_mappings
+from fuzzy_matcher import FUZZY_MIN_JACCARD, FUZZY_MIN_SIMILARITY, FUZZY_NGRAM, TRANSLITERATION_FOLDS
 
 # Load environment variables
 load_dotenv('../backend/.env')
 
-# Manual mapping rules (NAMASTE term -> ICD-11 code)
-MANUAL_MAPPINGS = {
-    'jwara': 'MG26',  # Fever
-    'jvara': 'MG26',
-    'suram': 'MG26',
-    'humma': 'MG26',
-    'fever': 'MG26',
-    'kasa': 'MD12',  # Cough
-    'irumal': 'MD12',
-    'sual': 'MD12',
-    'cough': 'MD12',
-    'shwasa': 'MD11',  # Dyspnoea
-    'swasa': 'MD11',
-    'dyspnoea': 'MD11',
-    'atisara': 'DD70',  # Diarrhoea
-    'diarrhoea': 'DD70',
-    'diarrhea': 'DD70',
-    'arsha': 'DB35',  # Haemorrhoids
-    'arsh': 'DB35',
-    'hemorrhoids': 'DB35',
-    'haemorrhoids': 'DB35',
-}
+# Mappings this script owns; anything else (e.g. 'who') is left alone
+MANAGED_PROVENANCE = ('rule', 'keyword', 'fuzzy')
+
+# Generated mappings from before provenance was recorded; the first run
+# re-scores every code and converts or deletes them
+LEGACY_CONDITION = "provenance IS NULL OR provenance = 'legacy'"
 
 def connect_db():
     """Connect to PostgreSQL database"""
@@ -60,110 +66,221 @@ def get_icd11_codes(conn):
     cursor.close()
     return [{'id': c[0], 'code': c[1], 'title': c[2], 'module': c[3]} for c in codes]
 
-def find_mapping_by_rule(namaste_display):
-    """Find ICD-11 code using manual rules"""
-    display_lower = namaste_display.lower().strip()
+def content_hash(*parts):
+    return hashlib.sha1('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def icd11_signature(icd11_codes):
+    """Changes whenever an ICD-11 code is added, removed, renamed, re-titled or moved to another module"""
+    return content_hash(*sorted(content_hash(c['id'], c['code'], c['title'], c['module']) for c in icd11_codes))
+
+def scorer_signature(icd11_codes, semantic=True):
+    """
+    Changes whenever the rules file, the ICD-11 targets, the embeddings or the
+    scorer settings change
+    """
+    with open(RULES_FILE, 'rb') as f:
+        rules_digest = hashlib.sha1(f.read()).hexdigest()
+    semantic_digest = embeddings_signature() if semantic else None
+    return content_hash(rules_digest, 'icd11', icd11_signature(icd11_codes),
+                        'keyword', KEYWORD_THRESHOLD,
+                        'fuzzy', FUZZY_MIN_WORD_LENGTH, FUZZY_NGRAM, FUZZY_MIN_JACCARD, FUZZY_MIN_SIMILARITY, TRANSLITERATION_FOLDS,
+                        'semantic', semantic_digest, SEMANTIC_TOP_K, SEMANTIC_MIN_SIMILARITY)
+
+def get_state(conn):
+    """Hashes recorded by the last run: {(source, key): (content_hash, result)}"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT source, key, content_hash, result FROM concept_map_state")
+    rows = cursor.fetchall()
+    cursor.close()
+    return {(r[0], r[1]): (r[2], r[3]) for r in rows}
+
+def has_legacy_mappings(conn):
+    """Whether unverified mappings from before provenance tracking are still around"""
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT EXISTS (
+            SELECT 1 FROM concept_mappings cm
+            WHERE ({LEGACY_CONDITION}) AND cm.verified IS NOT TRUE
+              AND NOT EXISTS (
+                  SELECT 1 FROM concept_mappings v
+                  WHERE v.verified AND v.namaste_code_id = cm.namaste_code_id
+              )
+        )
+        """
+    )
+    found = cursor.fetchone()[0]
+    cursor.close()
+    return found
+
+def plan_rescore(namaste_codes, state, signature, full=False):
+    """
+    NAMASTE code ids whose best mapping may differ from the last run's
+    Everything is re-scored when the rules, the ICD-11 targets or the scorer
+    settings changed (any new or renamed target could out-score a current
+    match); otherwise only the codes whose own text changed
+    """
+    if full or state.get(('config', 'scorer'), (None, None))[0] != signature:
+        return {n['id'] for n in namaste_codes}
+    
+    return {
+        n['id'] for n in namaste_codes
+        if state.get(('namaste', str(n['id'])), (None, None))[0] != content_hash(n['code'], n['display'])
+    }
+
+def create_semantic_candidates(namaste_codes, icd11_codes, only_ids, primary_mappings):
+    """
+    Review candidates from the nearest ICD-11 embeddings of each NAMASTE code,
+    ranked from 1 per code; None when there are no embeddings
+    All codes are scored together in blocked matrix products rather than one query each
+    """
+    matcher = SemanticMatcher.from_directory(icd11_codes)
+    if matcher is None:
+        print("No embeddings found (run semantic_search.py); skipping semantic stage")
+        return None
     
-    for term, icd_code in MANUAL_MAPPINGS.items():
-        if term in display_lower:
-            return icd_code, 0.95  # High confidence for manual mappings
+    selected = {str(n['id']): n for n in namaste_codes if only_ids is None or n['id'] in only_ids}
+    start = time.perf_counter()
+    candidates = matcher.candidates(list(selected))
     
-    return None, 0.0
+    icd11_by_id = {str(c['id']): c for c in icd11_codes}
+    already_mapped = {(str(m['namaste_id']), str(m['icd11_id'])) for m in primary_mappings}
+    
+    proposed = []
+    for namaste_id, neighbours in candidates.items():
+        rank = 0
+        for icd11_id, similarity in neighbours:
+            # A rule or keyword match to the same code already covers this pair
+            if (namaste_id, icd11_id) in already_mapped:
+                continue
+            rank += 1
+            proposed.append({
+                'namaste_id': selected[namaste_id]['id'],
+                'icd11_id': icd11_by_id[icd11_id]['id'],
+                'similarity': round(min(similarity, 1.0), 2),
+                'rank': rank
+            })
+    print(f"Semantic stage: {len(proposed)} candidates for {len(candidates)} codes in {time.perf_counter() - start:.2f}s")
+    return proposed
 
-def find_mapping_by_keywords(namaste_display, icd11_codes):
-    """Find ICD-11 code using keyword matching"""
-    display_lower = namaste_display.lower().strip()
+def diff_mappings(rescored_ids, existing_rows, mappings, skip_ids=()):
+    """
+    Inserts, updates and deletes that turn the existing generated mappings of the
+    re-scored codes into the new ones
+    existing_rows are (row id, namaste id, icd11 id, mapping type, confidence,
+    provenance) for unverified generated mappings; codes in skip_ids are left untouched
+    """
+    desired = {}
+    for m in mappings:
+        desired.setdefault(str(m['namaste_id']), {})[str(m['icd11_id'])] = m
+    existing = {}
+    for row in existing_rows:
+        existing.setdefault(str(row[1]), []).append(row)
     
-    # Try to find keywords in ICD-11 titles
-    best_match = None
-    best_score = 0.0
+    inserts, updates, deletes = [], [], []
+    for namaste_id in rescored_ids:
+        if namaste_id in skip_ids:
+            continue
+        wanted = dict(desired.get(str(namaste_id), {}))
+        for row_id, _, icd11_id, mapping_type, confidence, provenance in existing.get(str(namaste_id), []):
+            mapping = wanted.pop(str(icd11_id), None)
+            if mapping is None:
+                deletes.append(row_id)
+            elif (round(float(confidence), 2) != mapping['confidence'] or provenance != mapping['provenance']
+                  or mapping_type != mapping['mapping_type']):
+                updates.append((row_id, mapping['mapping_type'], mapping['confidence'], mapping['provenance']))
+        inserts.extend(wanted.values())
+    return inserts, updates, deletes
+
+def apply_mappings(conn, namaste_codes, rescored_ids, mappings, candidates, state, signature):
+    """
+    Write the changes for the re-scored codes and the new state in one transaction
+    Verified mappings, and every code that has one, are never modified
+    candidates replace the re-scored codes' semantic candidates (None: left as they are)
+    """
+    cursor = conn.cursor()
+    rescored = [str(i) for i in rescored_ids]
     
-    for icd11 in icd11_codes:
-        title_lower = icd11['title'].lower()
+    try:
+        cursor.execute(
+            """
+            SELECT DISTINCT namaste_code_id FROM concept_mappings
+            WHERE verified AND namaste_code_id = ANY(%s::uuid[])
+            """,
+            (rescored,)
+        )
+        verified_ids = {str(r[0]) for r in cursor.fetchall()}
         
-        # Check for exact word matches
-        namaste_words = set(display_lower.split())
-        icd11_words = set(title_lower.split())
+        cursor.execute(
+            f"""
+            SELECT id, namaste_code_id, icd11_code_id, mapping_type, confidence_score, provenance FROM concept_mappings
+            WHERE namaste_code_id = ANY(%s::uuid[]) AND (provenance IN %s OR {LEGACY_CONDITION})
+              AND verified IS NOT TRUE
+            """,
+            (rescored, MANAGED_PROVENANCE)
+        )
+        existing_rows = cursor.fetchall()
         
-        # Calculate overlap
-        common_words = namaste_words & icd11_words
-        if common_words:
-            # Score based on proportion of matching words
-            score = len(common_words) / max(len(namaste_words), len(icd11_words))
-            
-            if score > best_score:
-                best_score = score
-                best_match = icd11['code']
-    
-    if best_score > 0.3:  # Threshold for keyword matching
-        return best_match, float(best_score)
-    
-    return None, 0.0
-
-def create_mappings(conn, namaste_codes, icd11_codes):
-    """Create concept mappings"""
-    print("Creating concept mappings...")
-    
-    mappings = []
-    
-    for namaste in namaste_codes:
-        # Try manual rule first
-        icd_code, confidence = find_mapping_by_rule(namaste['display'])
+        skip_ids = {i for i in rescored_ids if str(i) in verified_ids}
+        inserts, updates, deletes = diff_mappings(rescored_ids, existing_rows, mappings, skip_ids)
         
-        # If no manual rule, try keyword matching
-        if not icd_code:
-            icd_code, confidence = find_mapping_by_keywords(namaste['display'], icd11_codes)
+        if deletes:
+            cursor.execute("DELETE FROM concept_mappings WHERE id = ANY(%s::uuid[])", ([str(d) for d in deletes],))
         
-        if icd_code:
-            # Find ICD-11 ID
-            icd11_match = next((c for c in icd11_codes if c['code'] == icd_code), None)
-            
-            if icd11_match:
-                mappings.append({
-                    'namaste_id': namaste['id'],
-                    'icd11_id': icd11_match['id'],
-                    'confidence': confidence,
-                    'namaste_display': namaste['display'],
-                    'icd11_title': icd11_match['title']
-                })
-                print(f"  {namaste['display']} -> {icd11_match['title']} ({confidence:.2f})")
-    
-    return mappings
-
-def insert_mappings(conn, mappings):
-    """Insert concept mappings into database"""
-    if not mappings:
-        print("No mappings to insert")
-        return 0
-    
-    cursor = conn.cursor()
-    
-    # Clear existing mappings
-    cursor.execute("DELETE FROM concept_mappings")
-    print("Cleared existing mappings")
-    
-    # Prepare data for insertion
-    values = [
-        (m['namaste_id'], m['icd11_id'], 'equivalent', m['confidence'])
-        for m in mappings
-    ]
-    
-    # Insert new mappings
-    insert_query = """
-        INSERT INTO concept_mappings (namaste_code_id, icd11_code_id, mapping_type, confidence_score)
-        VALUES %s
-        ON CONFLICT (namaste_code_id, icd11_code_id) DO UPDATE SET
-            confidence_score = EXCLUDED.confidence_score
-    """
-    
-    execute_values(cursor, insert_query, values)
-    conn.commit()
-    
-    inserted_count = cursor.rowcount
-    print(f"\nInserted {inserted_count} concept mappings")
+        if updates:
+            execute_values(cursor, """
+                UPDATE concept_mappings
+                SET mapping_type = v.mapping_type, confidence_score = v.confidence, provenance = v.provenance
+                FROM (VALUES %s) AS v(id, mapping_type, confidence, provenance)
+                WHERE concept_mappings.id = v.id::uuid
+            """, [(str(u[0]), u[1], u[2], u[3]) for u in updates])
+        
+        if inserts:
+            # A pair already held by another generator (or verified) is left as it is
+            merge_rows(
+                cursor, 'concept_mappings',
+                ('namaste_code_id', 'icd11_code_id', 'mapping_type', 'confidence_score', 'provenance'),
+                ((m['namaste_id'], m['icd11_id'], m['mapping_type'], m['confidence'], m['provenance']) for m in inserts),
+                key=('namaste_code_id', 'icd11_code_id')
+            )
+        
+        if candidates is not None:
+            cursor.execute("DELETE FROM concept_mapping_candidates WHERE namaste_code_id = ANY(%s::uuid[])", (rescored,))
+            merge_rows(
+                cursor, 'concept_mapping_candidates',
+                ('namaste_code_id', 'icd11_code_id', 'similarity', 'rank', 'provenance'),
+                ((c['namaste_id'], c['icd11_id'], c['similarity'], c['rank'], 'semantic') for c in candidates),
+                key=('namaste_code_id', 'icd11_code_id')
+            )
+        
+        # Record what was scored; skipped codes stay stale so they are retried next run
+        mapped_to = {m['namaste_id']: str(m['icd11_id']) for m in mappings}
+        state_rows = [('config', 'scorer', signature, None)]
+        state_rows += [
+            ('namaste', str(n['id']), content_hash(n['code'], n['display']), mapped_to.get(n['id']))
+            for n in namaste_codes if n['id'] in rescored_ids and n['id'] not in skip_ids
+        ]
+        merge_rows(
+            cursor, 'concept_map_state', ('source', 'key', 'content_hash', 'result'), state_rows,
+            key=('source', 'key'), update=('content_hash', 'result'), touch='updated_at'
+        )
+        
+        current_keys = {str(n['id']) for n in namaste_codes}
+        removed = [key for source, key in state if source == 'namaste' and key not in current_keys]
+        if removed:
+            cursor.execute("DELETE FROM concept_map_state WHERE source = 'namaste' AND key = ANY(%s)", (removed,))
+        
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
     
-    cursor.close()
-    return inserted_count
+    print(f"\nInserted {len(inserts)}, updated {len(updates)}, deleted {len(deletes)} concept mappings")
+    if skip_ids:
+        print(f"Left {len(skip_ids)} codes with verified mappings untouched")
+    return inserts, updates, deletes
 
 def main():
     """Main execution function"""
@@ -171,6 +288,12 @@ def main():
     print("Concept Mapping Generator")
     print("=" * 60)
     
+    parser = argparse.ArgumentParser(description='Create NAMASTE to ICD-11 concept mappings')
+    parser.add_argument('--full', action='store_true', help='re-score every code, not just the changed ones')
+    parser.add_argument('--no-semantic', action='store_true', help='skip the embedding-based stage')
+    parser.add_argument('--workers', type=int, default=None, help='scoring processes (default: all cores)')
+    args = parser.parse_args()
+    
     # Connect to database
     conn = connect_db()
     
@@ -183,17 +306,30 @@ def main():
     icd11_codes = get_icd11_codes(conn)
     print(f"Found {len(icd11_codes)} ICD-11 codes")
     
+    # Only re-score what changed since the last run
+    state = get_state(conn)
+    signature = scorer_signature(icd11_codes, not args.no_semantic)
+    full = args.full
+    if not full and has_legacy_mappings(conn):
+        print("\nFound mappings without provenance; re-scoring every code to convert them")
+        full = True
+    rescored_ids = plan_rescore(namaste_codes, state, signature, full)
+    print(f"\nRe-scoring {len(rescored_ids)} of {len(namaste_codes)} NAMASTE codes")
+    
     # Create mappings
     print("\nGenerating mappings...")
-    mappings = create_mappings(conn, namaste_codes, icd11_codes)
+    mappings = create_mappings(namaste_codes, icd11_codes, rescored_ids, args.workers)
+    candidates = None
+    if not args.no_semantic:
+        candidates = create_semantic_candidates(namaste_codes, icd11_codes, rescored_ids, mappings)
     
-    # Insert mappings
-    insert_mappings(conn, mappings)
+    # Apply the differences
+    apply_mappings(conn, namaste_codes, rescored_ids, mappings, candidates, state, signature)
     
     conn.close()
     
     print("\n" + "=" * 60)
-    print(f"TOTAL MAPPINGS CREATED: {len(mappings)}")
+    print(f"MAPPINGS FROM RE-SCORED CODES: {len(mappings)}")
     print("=" * 60)
     
     # Print statistics
@@ -1,38 +1,47 @@
-
 import joblib
-import pandas as pd
 import numpy as np
-from pathlib import Path
 import sklearn
 import sys
 
-DATA_DIR = Path(r"C:\Users\Hardik\OneDrive\Desktop\Projects\ayush-fhir\data")
-MODEL_PATH = DATA_DIR / "random_forest.joblib"
+from model_bundle import BUNDLE_DIR, read_manifest, load_symptom_columns, load_bundle_model
+from model_report import tree_stats, in_memory_bytes
 
 print(f"Python version: {sys.version}")
 print(f"Scikit-learn version: {sklearn.__version__}")
 print(f"Joblib version: {joblib.__version__}")
+print(f"NumPy version: {np.__version__}")
+
+manifest = read_manifest(BUNDLE_DIR)
+if manifest is None:
+    print(f"No model bundle found in {BUNDLE_DIR}. Run train_models.py first.")
+    sys.exit(1)
+
+print(f"\nBundle {BUNDLE_DIR} version {manifest['version']} (created {manifest['created_at']})")
+print(f"Default model: {manifest.get('default_model', 'not recorded')}")
+columns = load_symptom_columns(manifest, BUNDLE_DIR)
+print(f"Symptom columns: {len(columns)}")
+
+report = manifest.get('model_report', {})
+for name, entry in manifest['models'].items():
+    print(f"\n{name} ({entry['file']}, {entry['bytes'] / 1024:.1f} KB)")
+    try:
+        model = load_bundle_model(entry, columns, BUNDLE_DIR, mmap_mode=None)
+    except Exception as e:
+        print(f"  Error loading model: {e}")
+        continue
+
+    print(f"  Class: {type(model).__name__}, expected features: {getattr(model, 'n_features_in_', '?')}")
+    print(f"  In-memory size: {in_memory_bytes(model) / 1024:.1f} KB")
+    trees = tree_stats(model)
+    if trees:
+        print(f"  Trees: {trees['trees']}, nodes: {trees['nodes']}, max depth: {trees['max_depth']}")
+
+    # Latency as measured on the training machine
+    if name in report:
+        single = report[name]['single_row_ms']
+        print(f"  Single-row latency ms: p50 {single['p50']}, p95 {single['p95']}, p99 {single['p99']}")
+        print(f"  Batched: {report[name]['batch_row_us']} us/row")
 
-try:
-    print(f"Attempting to load {MODEL_PATH}")
-    model = joblib.load(MODEL_PATH)
-    print("Successfully loaded model")
-    
-    if hasattr(model, 'n_features_in_'):
-        print(f"Expected features: {model.n_features_in_}")
-    elif hasattr(model, 'n_features_'):
-         print(f"Expected features: {model.n_features_}")
-         
-    if hasattr(model, 'feature_names_in_'):
-        print(f"Feature names: {model.feature_names_in_}")
-        
-except Exception as e:
-    print(f"Error loading model: {e}")
-
-# Check columns in CSV
-csv_path = DATA_DIR / "training_data.csv"
-if csv_path.exists():
-    df = pd.read_csv(csv_path)
-    cols = [c for c in df.columns if c != 'prognosis']
-    print(f"CSV Feature count: {len(cols)}")
-    
+    accuracy = manifest.get('metrics', {}).get(name, {}).get('accuracy')
+    if accuracy is not None:
+        print(f"  Holdout accuracy: {accuracy}")
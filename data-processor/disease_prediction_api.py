@@ -6,106 +6,630 @@ Models: Random Forest, Gradient Boosting, Decision Tree, Naive Bayes
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import joblib
 import pandas as pd
 import numpy as np
 import os
+import json
+import math
+import hashlib
+import time
+import threading
+from functools import wraps
+from datetime import datetime, timezone
+from collections import OrderedDict
 from pathlib import Path
+from service_metrics import ServiceMetrics
+from symptom_index import SymptomSearchIndex, load_aliases
+from case_index import pack_indices, case_indices, nearest_cases
+from model_bundle import (
+    BUNDLE_DIR, MANIFEST_FILE, BundleError, read_manifest, legacy_manifest,
+    load_symptom_columns, load_bundle_model, load_artifact
+)
 
 app = Flask(__name__)
 CORS(app)
 
+# Request, stage and model-load timings served at /metrics
+metrics = ServiceMetrics('prediction')
+metrics.instrument(app)
+
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / 'data'
 
-# Global variables for models and symptoms
-models = {}
-symptom_columns = []
+# Model set currently being served; requests take one reference and use it throughout
+model_set = None
 
-def load_models():
-    """Load all 4 pre-trained models"""
-    global models
-    
-    model_files = {
-        'random_forest': 'random_forest.joblib',
-        'gradient_boost': 'gradient_boost.joblib',
-        'decision_tree': 'decision_tree.joblib',
-        'naive_bayes': 'mnb.joblib'
-    }
-    
-    print("Loading ML models...")
-    for name, filename in model_files.items():
-        model_path = DATA_DIR / filename
-        if model_path.exists():
+# 'r' keeps model arrays file-backed and shared between processes; 'none' copies them
+MODEL_MMAP_MODE = os.getenv('MODEL_MMAP_MODE', 'r')
+
+# 'dev' runs Flask's built-in server; 'prefork' runs pre-forked workers for production
+SERVER_MODE = os.getenv('PREDICTION_SERVER_MODE', 'dev')
+SERVER_WORKERS = int(os.getenv('PREDICTION_WORKERS', str(os.cpu_count() or 1)))
+
+# Seconds between checks of the bundle manifest for a new version (0 disables watching)
+MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', '5'))
+
+# Only one reload runs at a time; its outcome is reported by /health
+reload_lock = threading.Lock()
+reload_status = {
+    'state': 'idle',
+    'last_reload_at': None,
+    'last_error': None
+}
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of prediction results
+    Keys are (model name, model version, symptom bitset) tuples
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+prediction_cache = PredictionCache(int(os.getenv('PREDICTION_CACHE_SIZE', '4096')))
+
+class Rejected(Exception):
+    """Raised when admission control turns a request away"""
+
+    def __init__(self, status_code, reason, retry_after):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded wait queue
+    Requests beyond the queue are rejected at once (429); queued requests that
+    cannot start before their deadline are rejected (503)
+    """
+
+    def __init__(self, max_concurrent, max_queue, default_deadline):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.default_deadline = default_deadline
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        # Moving average of request service time, used for Retry-After estimates
+        self.avg_service_time = 0.05
+        self._cond = threading.Condition()
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained"""
+        backlog = self.in_flight + self.queued
+        return max(1, math.ceil(backlog * self.avg_service_time / self.max_concurrent))
+
+    def acquire(self, deadline):
+        with self._cond:
+            if self.in_flight >= self.max_concurrent and self.queued >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise Rejected(429, 'queue_full', self.retry_after())
+            
+            self.queued += 1
+            try:
+                while self.in_flight >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if self.in_flight >= self.max_concurrent:
+                            self.rejected_deadline += 1
+                            raise Rejected(503, 'deadline_exceeded', self.retry_after())
+            finally:
+                self.queued -= 1
+            
+            self.in_flight += 1
+            self.admitted += 1
+
+    def release(self, service_time):
+        with self._cond:
+            self.in_flight -= 1
+            self.avg_service_time = 0.9 * self.avg_service_time + 0.1 * service_time
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'in_flight': self.in_flight,
+                'queue_depth': self.queued,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_deadline': self.rejected_deadline,
+                'avg_service_ms': round(self.avg_service_time * 1000, 2)
+            }
+
+admission = AdmissionController(
+    max_concurrent=int(os.getenv('PREDICT_MAX_CONCURRENCY', str(os.cpu_count() or 1))),
+    max_queue=int(os.getenv('PREDICT_MAX_QUEUE', '32')),
+    default_deadline=float(os.getenv('PREDICT_DEADLINE_MS', '2000')) / 1000
+)
+
+# Cache and admission state, read when /metrics is scraped
+metrics.registry.callback(
+    'prediction_cache_lookups_total', 'Prediction cache lookups', 'counter',
+    lambda: {('hit',): prediction_cache.hits, ('miss',): prediction_cache.misses}, ('result',))
+metrics.registry.callback(
+    'prediction_cache_entries', 'Entries in the prediction cache', 'gauge',
+    lambda: prediction_cache.stats()['size'])
+metrics.registry.callback(
+    'prediction_queue_depth', 'Requests waiting for an inference slot', 'gauge',
+    lambda: admission.queued)
+metrics.registry.callback(
+    'prediction_admitted_in_flight', 'Requests holding an inference slot', 'gauge',
+    lambda: admission.in_flight)
+metrics.registry.callback(
+    'prediction_rejections_total', 'Requests rejected by admission control', 'counter',
+    lambda: {('queue_full',): admission.rejected_queue_full, ('deadline_exceeded',): admission.rejected_deadline},
+    ('reason',))
+
+def admission_controlled(view):
+    """
+    Run a view under admission control
+    Callers may shorten (never extend) the deadline with X-Request-Deadline-Ms
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        budget = admission.default_deadline
+        requested = request.headers.get('X-Request-Deadline-Ms')
+        if requested:
             try:
-                models[name] = joblib.load(model_path)
-                print(f"✓ Loaded {name} model")
+                budget = min(budget, max(0.0, float(requested) / 1000))
+            except ValueError:
+                pass
+        
+        try:
+            admission.acquire(time.monotonic() + budget)
+        except Rejected as rejection:
+            response = jsonify({
+                'error': 'Prediction service overloaded',
+                'reason': rejection.reason,
+                'retry_after': rejection.retry_after
+            })
+            response.status_code = rejection.status_code
+            response.headers['Retry-After'] = str(rejection.retry_after)
+            return response
+        
+        started = time.monotonic()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            admission.release(time.monotonic() - started)
+    return wrapper
+
+class ModelSet:
+    """
+    Models described by one bundle manifest
+    Each model is verified and unpickled on first use rather than at startup
+    """
+
+    def __init__(self, manifest, bundle_dir, symptom_columns):
+        self.manifest = manifest
+        self.bundle_dir = Path(bundle_dir)
+        self.version = str(manifest['version'])
+        self.symptom_columns = symptom_columns
+        self.symptom_index = {symptom: i for i, symptom in enumerate(symptom_columns)}
+        self._models = {}
+        self._lock = threading.Lock()
+        
+        # The catalogue only changes with the bundle, so serialize it once
+        self.search_index = SymptomSearchIndex(symptom_columns, load_aliases())
+        readable_symptoms = sorted(self.search_index.display)
+        self.catalogue_body = json.dumps({
+            'symptoms': readable_symptoms,
+            'count': len(readable_symptoms)
+        })
+        self.catalogue_etag = hashlib.sha1(self.catalogue_body.encode()).hexdigest()
+
+    def names(self):
+        return list(self.manifest['models'])
+
+    def default_model(self):
+        """Model chosen at training time by the accuracy-under-latency-budget rule"""
+        name = self.manifest.get('default_model')
+        if name in self.manifest['models']:
+            return name
+        # Bundles from before model reports, and the legacy layout
+        if 'random_forest' in self.manifest['models']:
+            return 'random_forest'
+        return self.names()[0]
+
+    def loaded_count(self):
+        return sum(1 for name in self._models if not name.startswith('artifact:'))
+
+    def get(self, name):
+        """Return a model, loading it from the bundle the first time it is asked for"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        
+        with self._lock:
+            if name not in self._models:
+                entry = self.manifest['models'][name]
+                mmap_mode = None if MODEL_MMAP_MODE == 'none' else MODEL_MMAP_MODE
+                start = time.perf_counter()
+                self._models[name] = load_bundle_model(entry, self.symptom_columns, self.bundle_dir, mmap_mode)
+                metrics.model_load.set(round(time.perf_counter() - start, 4), model=name, version=self.version)
+                print(f"✓ Loaded {name} model (version {self.version})")
+            return self._models[name]
+
+    def has_artifact(self, name):
+        return name in self.manifest.get('artifacts', {})
+
+    def get_artifact(self, name):
+        """Return a precomputed bundle array, loading it the first time it is asked for"""
+        key = f"artifact:{name}"
+        artifact = self._models.get(key)
+        if artifact is not None:
+            return artifact
+        
+        with self._lock:
+            if key not in self._models:
+                mmap_mode = None if MODEL_MMAP_MODE == 'none' else MODEL_MMAP_MODE
+                self._models[key] = load_artifact(self.manifest['artifacts'][name], self.bundle_dir, mmap_mode)
+            return self._models[key]
+
+    def load_all(self):
+        """Eagerly load every model, e.g. before forking workers"""
+        for name in self.names():
+            try:
+                self.get(name)
             except Exception as e:
                 print(f"✗ Error loading {name}: {e}")
-        else:
-            print(f"✗ Model file not found: {model_path}")
+        for name in self.manifest.get('artifacts', {}):
+            self.get_artifact(name)
+
+def build_model_set():
+    """Read the model bundle manifest into a ModelSet; models themselves are loaded lazily"""
+    print("Reading model bundle...")
+    manifest = read_manifest(BUNDLE_DIR)
+    bundle_dir = BUNDLE_DIR
     
-    print(f"Successfully loaded {len(models)} models")
+    if manifest is None:
+        print(f"No model bundle found in {BUNDLE_DIR}. Falling back to legacy files in {DATA_DIR}...")
+        manifest = legacy_manifest(DATA_DIR)
+        bundle_dir = DATA_DIR
+    
+    if manifest is None:
+        print("No models or symptoms.json found. Run train_models.py first.")
+        return None
+    
+    symptom_columns = load_symptom_columns(manifest, bundle_dir)
+    candidate = ModelSet(manifest, bundle_dir, symptom_columns)
+    print(f"Model bundle version {candidate.version}: {len(candidate.names())} models, {len(symptom_columns)} symptoms")
+    return candidate
 
-import json
+def activate_model_set(candidate):
+    """
+    Swap in a new model set
+    Requests already running keep the reference they started with and finish on it
+    """
+    global model_set
+    model_set = candidate
+    # Cached results belong to the previous models
+    prediction_cache.clear()
 
-def load_symptoms():
-    """Load symptom list from symptoms.json (generated during training)"""
-    global symptom_columns
-    
-    symptoms_file = DATA_DIR / 'symptoms.json'
-    if symptoms_file.exists():
-        with open(symptoms_file, 'r') as f:
-            symptom_columns = json.load(f)
-        print(f"Loaded {len(symptom_columns)} symptoms from JSON")
-    else:
-        print(f"Symptoms JSON not found: {symptoms_file}. Fallback to CSV...")
-        training_file = DATA_DIR / 'training_data.csv'
-        if training_file.exists():
-            df = pd.read_csv(training_file)
-            symptom_columns = [col for col in df.columns if col != 'prognosis' and not col.startswith('Unnamed')]
-            print(f"Loaded {len(symptom_columns)} symptoms from CSV")
-        else:
-            print(f"Training data not found: {training_file}")
+def load_models():
+    """Load the model bundle at startup"""
+    candidate = build_model_set()
+    if candidate is not None:
+        activate_model_set(candidate)
+    return candidate
 
-def create_symptom_vector(selected_symptoms):
-    """Create binary vector for symptoms"""
-    # Initialize all symptoms to 0
-    symptom_vector = {symptom: 0 for symptom in symptom_columns}
+def warm_model_set(candidate):
+    """Load every model and run a synthetic prediction so the first real request is not slow"""
+    indices = list(range(min(2, len(candidate.symptom_columns))))
+    symptom_vector = create_symptom_vector(indices, candidate.symptom_columns)
+    for name in candidate.names():
+        model = candidate.get(name)
+        model.predict(symptom_vector)
+        if hasattr(model, 'predict_proba'):
+            model.predict_proba(symptom_vector)
+
+def reload_models(force=False):
+    """
+    Load the current bundle in the calling thread, warm it and swap it in
+    The old models keep serving until the swap; a failed reload leaves them in place
+    """
+    if not reload_lock.acquire(blocking=False):
+        return False
     
-    # Set selected symptoms to 1
+    try:
+        reload_status['state'] = 'loading'
+        candidate = build_model_set()
+        if candidate is None:
+            raise BundleError("no model bundle to load")
+        
+        previous = model_set
+        if previous is not None and candidate.version == previous.version and not force:
+            reload_status['state'] = 'idle'
+            return True
+        
+        warm_model_set(candidate)
+        activate_model_set(candidate)
+        
+        reload_status.update({
+            'state': 'idle',
+            'last_reload_at': datetime.now(timezone.utc).isoformat(),
+            'last_error': None
+        })
+        print(f"✓ Now serving model bundle version {candidate.version}"
+              f" (was {previous.version if previous else 'none'})")
+        return True
+    except Exception as e:
+        reload_status.update({'state': 'failed', 'last_error': str(e)})
+        print(f"✗ Model reload failed, keeping current models: {e}")
+        return False
+    finally:
+        reload_lock.release()
+
+def start_reload(force=False):
+    """Run a reload on a background thread"""
+    threading.Thread(target=reload_models, args=(force,), daemon=True).start()
+
+def watch_model_bundle(interval):
+    """Poll the bundle manifest and reload whenever a new one is published"""
+    manifest_path = BUNDLE_DIR / MANIFEST_FILE
+    last_mtime = manifest_path.stat().st_mtime_ns if manifest_path.exists() else None
+    while True:
+        time.sleep(interval)
+        mtime = manifest_path.stat().st_mtime_ns if manifest_path.exists() else None
+        if mtime is not None and mtime != last_mtime:
+            last_mtime = mtime
+            reload_models()
+
+def start_bundle_watcher():
+    """Start watching the bundle directory unless MODEL_WATCH_INTERVAL is 0"""
+    if MODEL_WATCH_INTERVAL > 0:
+        threading.Thread(target=watch_model_bundle, args=(MODEL_WATCH_INTERVAL,), daemon=True).start()
+        print(f"Watching {BUNDLE_DIR / MANIFEST_FILE} for new models every {MODEL_WATCH_INTERVAL:g}s")
+
+def get_symptom_indices(current, selected_symptoms):
+    """Map selected symptom names to sorted column indices (unknown names are ignored)"""
+    indices = set()
     for symptom in selected_symptoms:
         # Normalize symptom name (replace spaces with underscores, lowercase)
         normalized = symptom.lower().replace(' ', '_')
-        if normalized in symptom_vector:
-            symptom_vector[normalized] = 1
+        if normalized in current.symptom_index:
+            indices.add(current.symptom_index[normalized])
+    return sorted(indices)
+
+def symptom_bitset(indices):
+    """Pack symptom indices into an integer bitset used as a cache key"""
+    bitset = 0
+    for i in indices:
+        bitset |= 1 << i
+    return bitset
+
+def create_symptom_vector(indices, symptom_columns):
+    """Create binary vector for symptoms"""
+    # Initialize all symptoms to 0 and set selected symptoms to 1
+    symptom_vector = np.zeros((1, len(symptom_columns)), dtype=np.int64)
+    symptom_vector[0, indices] = 1
     
     # Convert to DataFrame with correct column order
-    return pd.DataFrame([symptom_vector], columns=symptom_columns)
+    return pd.DataFrame(symptom_vector, columns=symptom_columns)
+
+def run_model(current, name, indices, symptom_vector=None):
+    """
+    Predict with one model, serving repeated symptom combinations from the cache
+    Returns (result, symptom_vector) so the vector is only built on a cache miss
+    """
+    cache_key = (name, current.version, symptom_bitset(indices))
+    result = prediction_cache.get(cache_key)
+    if result is not None:
+        return result, symptom_vector
+    
+    model = current.get(name)
+    if symptom_vector is None:
+        with metrics.stage('vectorize'):
+            symptom_vector = create_symptom_vector(indices, current.symptom_columns)
+    
+    with metrics.stage('infer', model=name):
+        prediction = model.predict(symptom_vector)[0]
+        
+        # Get probability if available
+        confidence = 0.0
+        if hasattr(model, 'predict_proba'):
+            proba = model.predict_proba(symptom_vector)
+            confidence = float(np.max(proba))
+    
+    result = {
+        'disease': str(prediction),
+        'confidence': round(confidence, 3)
+    }
+    prediction_cache.put(cache_key, result)
+    return result, symptom_vector
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    current = model_set
     return jsonify({
         'status': 'healthy',
         'service': 'Disease Prediction API',
-        'models_loaded': len(models),
-        'symptoms_count': len(symptom_columns)
+        'models_available': len(current.names()),
+        'models_loaded': current.loaded_count(),
+        'model_version': current.version,
+        'symptoms_count': len(current.symptom_columns),
+        'prediction_cache': prediction_cache.stats(),
+        'admission': admission.stats(),
+        'model_reload': reload_status
     })
 
 @app.route('/symptoms', methods=['GET'])
 def get_symptoms():
-    """Get list of all available symptoms"""
-    # Convert symptom names to readable format
-    readable_symptoms = [
-        symptom.replace('_', ' ').title() 
-        for symptom in symptom_columns
+    """Get list of all available symptoms (304 when the client's ETag is current)"""
+    current = model_set
+    response = app.response_class(current.catalogue_body, mimetype='application/json')
+    response.set_etag(current.catalogue_etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/symptoms/suggest', methods=['GET'])
+def suggest_symptoms():
+    """Ranked symptom suggestions for a partially typed name"""
+    query = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    suggestions = model_set.search_index.suggest(query, limit)
+    return jsonify({
+        'query': query,
+        'suggestions': suggestions,
+        'count': len(suggestions)
+    })
+
+def rank_next_symptoms(current, indices, limit):
+    """
+    Rank unselected symptoms by how much asking about them would tell us
+    P(symptom | selection) is estimated as the mean of the precomputed
+    P(symptom | each selected symptom); symptoms closest to 50/50 score highest
+    """
+    if indices:
+        conditional = current.get_artifact('symptom_cooccurrence')
+        probability = np.asarray(conditional[indices].mean(axis=0), dtype=np.float64).ravel()
+    else:
+        probability = np.array(current.get_artifact('symptom_prior'), dtype=np.float64)
+    probability[indices] = 0.0
+    
+    # Binary entropy in bits; symptoms never seen with the selection carry no information
+    p = np.clip(probability, 1e-12, 1 - 1e-12)
+    information = -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+    information[probability <= 0] = 0.0
+    
+    candidates = np.flatnonzero(information > 0)
+    top = candidates[np.argsort(-information[candidates], kind='stable')][:limit]
+    return [
+        {
+            'symptom': current.search_index.display[i],
+            'key': current.symptom_columns[i],
+            'probability': round(float(probability[i]), 3),
+            'information': round(float(information[i]), 3)
+        }
+        for i in top
     ]
+
+@app.route('/symptoms/next', methods=['POST'])
+def next_symptoms():
+    """Suggest the most informative symptoms to ask about next, given those already selected"""
+    data = request.get_json(silent=True) or {}
+    selected_symptoms = data.get('symptoms', [])
+    try:
+        limit = min(max(int(data.get('limit', 5)), 1), 50)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    current = model_set
+    if not current.has_artifact('symptom_cooccurrence'):
+        return jsonify({
+            'error': 'Symptom co-occurrence data not available',
+            'message': 'Retrain with train_models.py to build it'
+        }), 503
+    
+    indices = get_symptom_indices(current, selected_symptoms)
+    suggestions = rank_next_symptoms(current, indices, limit)
+    return jsonify({
+        'suggestions': suggestions,
+        'count': len(suggestions),
+        'model_version': current.version
+    })
+
+@app.route('/cases/similar', methods=['POST'])
+def similar_cases():
+    """Training cases closest to the selected symptoms, as supporting evidence for a prediction"""
+    data = request.get_json(silent=True) or {}
+    selected_symptoms = data.get('symptoms', [])
+    metric = data.get('metric', 'jaccard')
+    try:
+        k = min(max(int(data.get('k', 5)), 1), 100)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'k must be an integer'}), 400
+    
+    if metric not in ('jaccard', 'hamming'):
+        return jsonify({'error': f'Unknown metric {metric}', 'available_metrics': ['jaccard', 'hamming']}), 400
+    
+    current = model_set
+    if not current.has_artifact('case_bits'):
+        return jsonify({
+            'error': 'Case index not available',
+            'message': 'Retrain with train_models.py to build it'
+        }), 503
+    
+    indices = get_symptom_indices(current, selected_symptoms)
+    if not indices:
+        return jsonify({'error': 'No known symptoms provided'}), 400
+    
+    n_columns = len(current.symptom_columns)
+    case_bits = current.get_artifact('case_bits')
+    case_counts = current.get_artifact('case_symptom_counts')
+    labels = current.get_artifact('case_labels')
+    query = pack_indices(indices, n_columns)
+    
+    with metrics.stage('nearest_cases'):
+        case_ids, scores, shared = nearest_cases(case_bits, case_counts, query, k, metric)
+    
+    results = []
+    for case_id, score, shared_count in zip(case_ids, scores, shared):
+        results.append({
+            'case_index': int(case_id),
+            'disease': str(labels[case_id]),
+            metric: round(float(score), 3),
+            'shared_symptoms': int(shared_count),
+            'symptoms': [current.search_index.display[i] for i in case_indices(case_bits, case_id, n_columns)]
+        })
     
     return jsonify({
-        'symptoms': sorted(readable_symptoms),
-        'count': len(readable_symptoms)
+        'cases': results,
+        'metric': metric,
+        'cases_searched': int(case_bits.shape[1]),
+        'model_version': current.version
     })
 
 @app.route('/models', methods=['GET'])
@@ -114,37 +638,46 @@ def get_models():
     model_info = {
         'random_forest': {
             'name': 'Random Forest',
-            'description': 'Ensemble learning method, good balance of accuracy and speed',
-            'recommended': True
+            'description': 'Ensemble learning method, good balance of accuracy and speed'
         },
         'gradient_boost': {
             'name': 'Gradient Boosting',
-            'description': 'High accuracy, slower prediction time',
-            'recommended': False
+            'description': 'High accuracy, slower prediction time'
         },
         'decision_tree': {
             'name': 'Decision Tree',
-            'description': 'Fast predictions, interpretable results',
-            'recommended': False
+            'description': 'Fast predictions, interpretable results'
         },
         'naive_bayes': {
             'name': 'Naive Bayes',
-            'description': 'Probabilistic model, lightweight and fast',
-            'recommended': False
+            'description': 'Probabilistic model, lightweight and fast'
         }
     }
     
-    available_models = {
-        name: info for name, info in model_info.items() 
-        if name in models
-    }
+    current = model_set
+    default_model = current.default_model()
+    report = current.manifest.get('model_report', {})
+    model_metrics = current.manifest.get('metrics', {})
+    
+    available_models = {}
+    for name in current.names():
+        info = dict(model_info.get(name, {'name': name, 'description': ''}))
+        info['recommended'] = name == default_model
+        if name in model_metrics:
+            info['accuracy'] = model_metrics[name].get('accuracy')
+        if name in report:
+            info['latency_ms_p95'] = report[name]['single_row_ms']['p95']
+            info['size_bytes'] = report[name]['serialized_bytes']
+        available_models[name] = info
     
     return jsonify({
         'models': available_models,
+        'default_model': default_model,
         'count': len(available_models)
     })
 
 @app.route('/predict', methods=['POST'])
+@admission_controlled
 def predict_disease():
     """Predict disease from symptoms"""
     try:
@@ -156,7 +689,8 @@ def predict_disease():
             }), 400
         
         selected_symptoms = data['symptoms']
-        model_name = data.get('model', 'random_forest')
+        current = model_set
+        model_name = data.get('model') or current.default_model()
         
         if not selected_symptoms:
             return jsonify({
@@ -168,59 +702,45 @@ def predict_disease():
                 'error': 'Please select at least 2 symptoms for accurate prediction'
             }), 400
         
-        # Create symptom vector
-        symptom_vector = create_symptom_vector(selected_symptoms)
+        indices = get_symptom_indices(current, selected_symptoms)
+        symptom_vector = None
         
         # Predict with requested model or all models
         if model_name == 'all':
             predictions = {}
-            for name, model in models.items():
+            for name in current.names():
                 try:
-                    prediction = model.predict(symptom_vector)[0]
-                    
-                    # Get probability if available
-                    confidence = 0.0
-                    if hasattr(model, 'predict_proba'):
-                        proba = model.predict_proba(symptom_vector)
-                        confidence = float(np.max(proba))
-                    
-                    predictions[name] = {
-                        'disease': prediction,
-                        'confidence': round(confidence, 3)
-                    }
+                    predictions[name], symptom_vector = run_model(current, name, indices, symptom_vector)
                 except Exception as e:
                     predictions[name] = {
                         'error': str(e)
                     }
             
-            return jsonify({
-                'predictions': predictions,
-                'symptoms_count': len(selected_symptoms)
-            })
+            with metrics.stage('serialize'):
+                return jsonify({
+                    'predictions': predictions,
+                    'model_version': current.version,
+                    'symptoms_count': len(selected_symptoms)
+                })
         
         else:
             # Single model prediction
-            if model_name not in models:
+            if model_name not in current.names():
                 return jsonify({
                     'error': f'Model {model_name} not found',
-                    'available_models': list(models.keys())
+                    'available_models': current.names()
                 }), 400
             
-            model = models[model_name]
-            prediction = model.predict(symptom_vector)[0]
+            result, _ = run_model(current, model_name, indices)
             
-            # Get confidence score
-            confidence = 0.0
-            if hasattr(model, 'predict_proba'):
-                proba = model.predict_proba(symptom_vector)
-                confidence = float(np.max(proba))
-            
-            return jsonify({
-                'model': model_name,
-                'prediction': prediction,
-                'confidence': round(confidence, 3),
-                'symptoms_count': len(selected_symptoms)
-            })
+            with metrics.stage('serialize'):
+                return jsonify({
+                    'model': model_name,
+                    'prediction': result['disease'],
+                    'confidence': result['confidence'],
+                    'model_version': current.version,
+                    'symptoms_count': len(selected_symptoms)
+                })
     
     except Exception as e:
         return jsonify({
@@ -228,6 +748,31 @@ def predict_disease():
             'message': str(e)
         }), 500
 
+def is_admin_request():
+    """Admin calls need X-Admin-Token when ADMIN_TOKEN is set, otherwise must come from localhost"""
+    admin_token = os.getenv('ADMIN_TOKEN')
+    if admin_token:
+        return request.headers.get('X-Admin-Token') == admin_token
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Load the latest model bundle in the background and swap it in when warm"""
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    if reload_lock.locked():
+        return jsonify({
+            'status': 'already_reloading',
+            'model_version': model_set.version
+        }), 409
+    
+    start_reload(force=request.args.get('force', 'false').lower() == 'true')
+    return jsonify({
+        'status': 'reloading',
+        'model_version': model_set.version
+    }), 202
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -241,19 +786,38 @@ if __name__ == '__main__':
     print("Disease Prediction API Service")
     print("=" * 60)
     
-    # Load models and symptoms
+    # Read the model bundle; models load lazily unless preloading is requested
     load_models()
-    load_symptoms()
     
-    if not models:
+    if model_set is None or not model_set.names():
         print("ERROR: No models loaded. Please check model files.")
         exit(1)
     
-    if not symptom_columns:
+    if not model_set.symptom_columns:
         print("ERROR: No symptoms loaded. Please check training data.")
         exit(1)
     
-    print("\nStarting Flask server on http://localhost:5001")
-    print("=" * 60)
-    
-    app.run(host='0.0.0.0', port=5001, debug=False)
+    if SERVER_MODE == 'prefork':
+        # Load every model and artifact, and warm them, once so forked workers share them copy-on-write
+        model_set.load_all()
+        warm_model_set(model_set)
+        
+        from prefork_server import serve_prefork
+        print(f"\nStarting pre-forked server on http://localhost:5001 with {SERVER_WORKERS} workers")
+        print("=" * 60)
+        serve_prefork(
+            app, '0.0.0.0', 5001, SERVER_WORKERS,
+            num_threads=int(os.getenv('WORKER_BLAS_THREADS', '0')) or None,
+            # Threads do not survive fork, so each worker watches the bundle itself
+            on_worker_start=lambda worker_id: start_bundle_watcher()
+        )
+    else:
+        if os.getenv('PRELOAD_MODELS', 'false').lower() == 'true':
+            model_set.load_all()
+        
+        start_bundle_watcher()
+        
+        print("\nStarting Flask server on http://localhost:5001")
+        print("=" * 60)
+        
+        app.run(host='0.0.0.0', port=5001, debug=False)
@@ -0,0 +1,178 @@
+"""
+Transliteration-aware fuzzy matching for Sanskrit, Tamil and Arabic terms
+The same term turns up in many romanizations (jwara/jvara, kasa/kaasa,
+pitta/pita). Terms are folded to one spelling first; whatever still differs
+is compared with a bounded edit distance, but only against terms that share
+enough character n-grams with the query, found through an n-gram index.
+"""
+
+import math
+import os
+import re
+import unicodedata
+
+# Character n-gram size used for blocking
+FUZZY_NGRAM = 3
+
+# Minimum n-gram Jaccard similarity for a pair to be compared at all
+FUZZY_MIN_JACCARD = float(os.getenv('FUZZY_MIN_JACCARD', '0.3'))
+
+# Minimum edit similarity (1 - edits / longer length) for a fuzzy match
+FUZZY_MIN_SIMILARITY = float(os.getenv('FUZZY_MIN_SIMILARITY', '0.8'))
+
+# Spelling variants folded to one form, applied in order after super_normalize
+TRANSLITERATION_FOLDS = (
+    ('w', 'v'),                                   # jwara / jvara
+    ('chh', 'c'), ('ch', 'c'),                    # chhardi / chardi / cardi
+    ('kh', 'k'), ('gh', 'g'), ('jh', 'j'),        # aspirates written with or without h
+    ('th', 't'), ('dh', 'd'), ('ph', 'p'), ('bh', 'b'),
+    ('sh', 's'),                                  # shotha / sotha (also s with dots)
+    ('q', 'k'),                                   # Arabic qaf: qabz / kabz
+    ('ee', 'i'), ('oo', 'u'),                     # long vowels: teevra / tivra
+)
+
+def super_normalize(text):
+    """
+    Aggressive normalization to match Sanskrit/regional terms
+    1. Lowercase
+    2. Decompose Unicode (split accents)
+    3. Drop non-ASCII (accents)
+    4. Remove ALL non-alphabet characters
+    """
+    if not text:
+        return ""
+    text = text.lower()
+    # Normalize unicode
+    text = unicodedata.normalize('NFKD', text)
+    # Encode to ASCII bytes, ignoring errors (strips accents), then decode back
+    text = text.encode('ASCII', 'ignore').decode('utf-8')
+    # Remove everything except a-z
+    text = re.sub(r'[^a-z]', '', text)
+    return text
+
+def sanskrit_stem(text):
+    """
+    Removes common Sanskrit case endings (Visarga 'h', Anusvara 'm')
+    to match 'Vatavyadhih' with 'Vatavyadhi'
+    """
+    text = super_normalize(text)
+    if text.endswith('h'):
+        return text[:-1]
+    if text.endswith('m'):
+        return text[:-1]
+    return text
+
+def fold_transliteration(text):
+    """
+    One spelling for every romanization of a term
+    super_normalize, then the TRANSLITERATION_FOLDS, then doubled letters
+    collapsed (kaasa -> kasa, pitta -> pita) and a case ending stripped
+    """
+    text = super_normalize(text)
+    for variant, folded in TRANSLITERATION_FOLDS:
+        text = text.replace(variant, folded)
+    text = re.sub(r'(.)\1+', r'\1', text)
+    if len(text) > 3 and text[-1] in 'hm':
+        text = text[:-1]
+    return text
+
+def ngrams(folded, n=FUZZY_NGRAM):
+    """Distinct character n-grams of a folded term, padded so the ends count"""
+    padded = f"^{folded}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+def bounded_edit_distance(a, b, bound):
+    """
+    Levenshtein distance between a and b, or None when it exceeds bound
+    Only the diagonal band of width 2 * bound + 1 is filled in, and the scan
+    stops as soon as a whole row is over the bound.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    over = bound + 1
+    previous = [j if j <= bound else over for j in range(len(b) + 1)]
+    for i, char in enumerate(a, 1):
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= bound else over
+        low, high = max(1, i - bound), min(len(b), i + bound)
+        for j in range(low, high + 1):
+            cost = 0 if char == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost, over)
+        if min(current[low - 1:high + 1]) > bound:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= bound else None
+
+class FuzzyIndex:
+    """
+    Character n-gram index over a list of terms
+    A query only probes the postings of its rarest n-grams: enough of them
+    that any term reaching FUZZY_MIN_JACCARD must share at least one (prefix
+    filtering), so building and querying stay near-linear in the term count.
+    The candidates found are then checked for n-gram Jaccard, length and a
+    bounded edit distance. Ties go to the earliest term.
+    """
+
+    def __init__(self, terms, values=None, min_jaccard=FUZZY_MIN_JACCARD,
+                 min_similarity=FUZZY_MIN_SIMILARITY):
+        self.terms = list(terms)
+        self.values = list(values) if values is not None else self.terms
+        self.min_jaccard = min_jaccard
+        self.min_similarity = min_similarity
+        self.folded = [fold_transliteration(term) for term in self.terms]
+        self.grams = [ngrams(folded) if folded else set() for folded in self.folded]
+
+        self.exact = {}
+        self.postings = {}
+        for position, (folded, grams) in enumerate(zip(self.folded, self.grams)):
+            if not folded:
+                continue
+            self.exact.setdefault(folded, position)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(position)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def candidates(self, query_grams):
+        """Positions sharing at least one of the query's prefix n-grams"""
+        required = max(1, math.ceil(self.min_jaccard * len(query_grams)))
+        rarest = sorted(query_grams, key=lambda gram: (len(self.postings.get(gram, ())), gram))
+        found = set()
+        for gram in rarest[:len(query_grams) - required + 1]:
+            found.update(self.postings.get(gram, ()))
+        return found
+
+    def best_match(self, text):
+        """(value, similarity) of the closest term, else (None, 0.0)"""
+        folded = fold_transliteration(text)
+        if not folded:
+            return None, 0.0
+        if folded in self.exact:
+            return self.values[self.exact[folded]], 1.0
+
+        query_grams = ngrams(folded)
+        best, best_similarity = None, 0.0
+        for position in sorted(self.candidates(query_grams)):
+            other = self.folded[position]
+            longer = max(len(folded), len(other))
+            bound = int((1 - self.min_similarity) * longer + 1e-9)
+            if abs(len(folded) - len(other)) > bound:
+                continue
+            shared = len(query_grams & self.grams[position])
+            if shared < self.min_jaccard * (len(query_grams) + len(self.grams[position]) - shared):
+                continue
+            distance = bounded_edit_distance(folded, other, bound)
+            if distance is None:
+                continue
+            similarity = 1 - distance / longer
+            if similarity > best_similarity:
+                best, best_similarity = position, similarity
+
+        if best is None:
+            return None, 0.0
+        return self.values[best], best_similarity
@@ -0,0 +1,277 @@
+"""
+Model bundle format shared by train_models.py and disease_prediction_api.py
+A bundle is a directory holding versioned joblib model files, the symptom
+column list and a manifest.json describing them with content hashes
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+DATA_DIR = BASE_DIR / 'data'
+BUNDLE_DIR = Path(os.getenv('MODEL_BUNDLE_DIR', DATA_DIR / 'model_bundle'))
+
+MANIFEST_FILE = 'manifest.json'
+BUNDLE_FORMAT = 1
+
+# Legacy single-file layout used before bundles existed
+LEGACY_MODEL_FILES = {
+    'random_forest': ['random_forest.joblib'],
+    'gradient_boost': ['gradient_boost.joblib'],
+    'decision_tree': ['decision_tree.joblib'],
+    'naive_bayes': ['naive_bayes.joblib', 'mnb.joblib']
+}
+
+VERSIONED_FILE_PATTERN = re.compile(r'-v(\d+)\.(joblib|json|npy|npz)$')
+
+class BundleError(Exception):
+    """Raised when a bundle is missing, corrupt or inconsistent"""
+
+def file_sha256(path):
+    """Hash a file in chunks so large models are never read into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_manifest(bundle_dir=BUNDLE_DIR):
+    """Read the bundle manifest, or None if no bundle has been written"""
+    manifest_path = Path(bundle_dir) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise BundleError(f"Unsupported bundle format: {manifest.get('format')}")
+    return manifest
+
+def publish_manifest(manifest, bundle_dir=BUNDLE_DIR):
+    """Atomically replace the manifest so readers never see a partial bundle"""
+    bundle_dir = Path(bundle_dir)
+    tmp_path = bundle_dir / f".{MANIFEST_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, bundle_dir / MANIFEST_FILE)
+
+def describe_file(bundle_dir, filename):
+    """Manifest entry for a file already written into the bundle"""
+    path = Path(bundle_dir) / filename
+    return {
+        'file': filename,
+        'sha256': file_sha256(path),
+        'bytes': path.stat().st_size
+    }
+
+def next_version(bundle_dir=BUNDLE_DIR):
+    """Version number the next published bundle should carry"""
+    manifest = read_manifest(bundle_dir)
+    return (manifest['version'] + 1) if manifest else 1
+
+def dump_model(model, name, version, bundle_dir=BUNDLE_DIR):
+    """
+    Write one model into the bundle and return its manifest entry
+    Models are dumped uncompressed so their numpy arrays can be memory-mapped
+    """
+    filename = f"{name}-v{version}.joblib"
+    joblib.dump(model, Path(bundle_dir) / filename)
+    entry = describe_file(bundle_dir, filename)
+    entry['class'] = type(model).__name__
+    entry['n_features'] = int(getattr(model, 'n_features_in_', 0))
+    return entry
+
+def dump_artifact(artifact, name, version, bundle_dir=BUNDLE_DIR):
+    """
+    Write a precomputed array into the bundle and return its manifest entry
+    Dense arrays are stored as .npy (memory-mappable), scipy sparse matrices as .npz
+    """
+    if isinstance(artifact, np.ndarray):
+        filename = f"{name}-v{version}.npy"
+        np.save(Path(bundle_dir) / filename, artifact)
+        kind = 'ndarray'
+    else:
+        from scipy import sparse
+        filename = f"{name}-v{version}.npz"
+        sparse.save_npz(Path(bundle_dir) / filename, artifact.tocsr(), compressed=False)
+        kind = 'sparse'
+    entry = describe_file(bundle_dir, filename)
+    entry['kind'] = kind
+    entry['shape'] = list(artifact.shape)
+    return entry
+
+def load_artifact(entry, bundle_dir=BUNDLE_DIR, mmap_mode='r'):
+    """Verify and load one precomputed array from the bundle"""
+    path = verify_file(bundle_dir, entry)
+    if entry['kind'] == 'ndarray':
+        return np.load(path, mmap_mode=mmap_mode)
+    from scipy import sparse
+    return sparse.load_npz(path)
+
+def write_bundle(models, symptoms, bundle_dir=BUNDLE_DIR, extra=None, artifacts=None):
+    """
+    Write models, precomputed artifacts and symptom column order as a new bundle version
+    Files are versioned, and the manifest is swapped in last, so a reader
+    always sees either the old or the new bundle in full
+    """
+    bundle_dir = Path(bundle_dir)
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    version = next_version(bundle_dir)
+
+    symptoms_file = f"symptoms-v{version}.json"
+    with open(bundle_dir / symptoms_file, 'w') as f:
+        json.dump(list(symptoms), f)
+    symptoms_entry = describe_file(bundle_dir, symptoms_file)
+    symptoms_entry['columns'] = list(symptoms)
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'symptoms': symptoms_entry,
+        'models': {
+            name: dump_model(model, name, version, bundle_dir)
+            for name, model in models.items()
+        },
+        'artifacts': {
+            name: dump_artifact(artifact, name, version, bundle_dir)
+            for name, artifact in (artifacts or {}).items()
+        }
+    }
+    if extra:
+        manifest.update(extra)
+
+    publish_manifest(manifest, bundle_dir)
+    prune_bundle(manifest, bundle_dir)
+    return manifest
+
+def update_bundle(models, bundle_dir=BUNDLE_DIR, extra=None):
+    """
+    Publish a new bundle version that replaces only the given models
+    Unchanged models, artifacts and the symptom list keep their existing files,
+    so an incremental update costs one model dump
+    """
+    bundle_dir = Path(bundle_dir)
+    current = read_manifest(bundle_dir)
+    if current is None:
+        raise BundleError(f"No bundle to update in {bundle_dir}")
+    version = current['version'] + 1
+
+    manifest = dict(current)
+    manifest['version'] = version
+    manifest['created_at'] = datetime.now(timezone.utc).isoformat()
+    manifest['models'] = dict(current['models'])
+    for name, model in models.items():
+        check_feature_order(model, current['symptoms']['columns'])
+        manifest['models'][name] = dump_model(model, name, version, bundle_dir)
+    if extra:
+        manifest.update(extra)
+
+    publish_manifest(manifest, bundle_dir)
+    prune_bundle(manifest, bundle_dir)
+    return manifest
+
+def referenced_files(manifest):
+    """All bundle files a manifest points at"""
+    files = {manifest['symptoms']['file']}
+    files.update(entry['file'] for entry in manifest['models'].values())
+    files.update(entry['file'] for entry in manifest.get('artifacts', {}).values())
+    return files
+
+def prune_bundle(manifest, bundle_dir=BUNDLE_DIR):
+    """
+    Remove versioned files older than the previous version
+    The previous version is kept so a service still serving it can finish
+    lazily loading its models
+    """
+    bundle_dir = Path(bundle_dir)
+    keep = referenced_files(manifest)
+    for path in bundle_dir.iterdir():
+        match = VERSIONED_FILE_PATTERN.search(path.name)
+        if match and path.name not in keep and int(match.group(1)) < manifest['version'] - 1:
+            path.unlink()
+
+def verify_file(bundle_dir, entry):
+    """Check a bundle file against its manifest hash"""
+    path = Path(bundle_dir) / entry['file']
+    if not path.exists():
+        raise BundleError(f"Bundle file missing: {path}")
+    actual = file_sha256(path)
+    if actual != entry['sha256']:
+        raise BundleError(f"Hash mismatch for {entry['file']}: expected {entry['sha256'][:12]}, got {actual[:12]}")
+    return path
+
+def load_symptom_columns(manifest, bundle_dir=BUNDLE_DIR):
+    """Load the symptom column order and check it matches the manifest"""
+    path = verify_file(bundle_dir, manifest['symptoms'])
+    with open(path, 'r') as f:
+        columns = json.load(f)
+    if columns != manifest['symptoms']['columns']:
+        raise BundleError("symptoms file does not match the manifest column order")
+    return columns
+
+def check_feature_order(model, columns):
+    """Make sure a model was trained on exactly these columns, in this order"""
+    feature_names = getattr(model, 'feature_names_in_', None)
+    if feature_names is not None:
+        if list(feature_names) != list(columns):
+            raise BundleError("model feature order does not match symptom columns")
+    elif getattr(model, 'n_features_in_', len(columns)) != len(columns):
+        raise BundleError(f"model expects {model.n_features_in_} features, bundle has {len(columns)}")
+
+def load_bundle_model(entry, columns, bundle_dir=BUNDLE_DIR, mmap_mode='r'):
+    """
+    Verify and load one model from the bundle
+    With mmap_mode the numpy arrays stay file-backed, so forked workers
+    share the same page-cache pages instead of private copies
+    """
+    path = verify_file(bundle_dir, entry)
+    model = joblib.load(path, mmap_mode=mmap_mode)
+    check_feature_order(model, columns)
+    return model
+
+def legacy_manifest(data_dir=DATA_DIR):
+    """
+    Describe the old flat data/ layout as a manifest so it can still be served
+    Returns None if no legacy model files exist
+    """
+    data_dir = Path(data_dir)
+    symptoms_path = data_dir / 'symptoms.json'
+    if not symptoms_path.exists():
+        return None
+
+    models = {}
+    for name, candidates in LEGACY_MODEL_FILES.items():
+        for filename in candidates:
+            if (data_dir / filename).exists():
+                models[name] = describe_file(data_dir, filename)
+                break
+    if not models:
+        return None
+
+    with open(symptoms_path, 'r') as f:
+        columns = json.load(f)
+    symptoms_entry = describe_file(data_dir, 'symptoms.json')
+    symptoms_entry['columns'] = columns
+
+    # Content hashes double as a version for the legacy layout
+    digest = hashlib.sha1(symptoms_entry['sha256'].encode())
+    for name in sorted(models):
+        digest.update(models[name]['sha256'].encode())
+
+    return {
+        'format': BUNDLE_FORMAT,
+        'version': f"legacy-{digest.hexdigest()[:12]}",
+        'created_at': None,
+        'symptoms': symptoms_entry,
+        'models': models
+    }
@@ -0,0 +1,164 @@
+"""
+Footprint and inference-latency report for trained models
+Measured at training time on the training machine and stored in the bundle
+manifest, where it is used to pick the default model the API serves.
+"""
+
+import io
+import mmap
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Default p95 single-row latency a model must meet to be the default
+LATENCY_BUDGET_MS = float(os.getenv('MODEL_LATENCY_BUDGET_MS', '25'))
+
+SINGLE_ROW_SAMPLES = 200
+BATCH_SIZE = 256
+BATCH_REPEATS = 20
+
+def serialized_bytes(model):
+    """Size of the model as joblib writes it into the bundle"""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell()
+
+def is_file_backed(array):
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = getattr(base, 'base', None)
+    return False
+
+def in_memory_bytes(obj, seen=None):
+    """Approximate resident size: numpy buffers plus Python object overhead, each counted once"""
+    # Holds a reference to everything visited: __getstate__ builds temporary
+    # objects, and a freed temporary's id could be reused by a later object
+    if seen is None:
+        seen = {}
+    if id(obj) in seen:
+        return 0
+    seen[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        # Memory-mapped buffers live in the page cache, not the process heap
+        size = 0 if is_file_backed(obj) else obj.nbytes
+        if obj.dtype == object:
+            size += sum(in_memory_bytes(item, seen) for item in obj.ravel())
+        return size
+
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, dict):
+        size += sum(in_memory_bytes(k, seen) + in_memory_bytes(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(in_memory_bytes(item, seen) for item in obj)
+    elif hasattr(obj, '__getstate__') and type(obj).__module__.startswith('sklearn'):
+        # sklearn's Cython trees only expose their node arrays through their pickled state
+        state = obj.__getstate__()
+        if isinstance(state, dict):
+            size += in_memory_bytes(state, seen)
+    elif hasattr(obj, '__dict__'):
+        size += in_memory_bytes(vars(obj), seen)
+    return size
+
+def tree_stats(model):
+    """Tree, node and depth counts for tree-based models; None for everything else"""
+    if hasattr(model, 'tree_'):
+        trees = [model]
+    elif hasattr(model, 'estimators_'):
+        trees = list(np.asarray(model.estimators_, dtype=object).ravel())
+    else:
+        return None
+    return {
+        'trees': len(trees),
+        'nodes': int(sum(tree.tree_.node_count for tree in trees)),
+        'max_depth': int(max(tree.tree_.max_depth for tree in trees))
+    }
+
+def percentiles_ms(samples):
+    values = np.asarray(samples) * 1000
+    return {
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p95': round(float(np.percentile(values, 95)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3)
+    }
+
+def measure_latency(model, X):
+    """
+    predict_proba latency for single rows (shaped like an API request) and for batches
+    X is a DataFrame of candidate rows; rows are sampled with a fixed seed
+    """
+    rng = np.random.default_rng(42)
+    columns = X.columns
+
+    single = []
+    rows = rng.integers(0, len(X), SINGLE_ROW_SAMPLES)
+    for row in rows:
+        # Same dtype and shape as create_symptom_vector builds for /predict
+        vector = pd.DataFrame(np.asarray(X.iloc[[row]], dtype=np.int64), columns=columns)
+        start = time.perf_counter()
+        model.predict_proba(vector)
+        single.append(time.perf_counter() - start)
+
+    batch = []
+    batch_size = min(BATCH_SIZE, len(X))
+    for _ in range(BATCH_REPEATS):
+        rows = rng.integers(0, len(X), batch_size)
+        frame = X.iloc[rows]
+        start = time.perf_counter()
+        model.predict_proba(frame)
+        batch.append(time.perf_counter() - start)
+
+    batch_ms = percentiles_ms(batch)
+    return {
+        'single_row_ms': percentiles_ms(single),
+        'batch_ms': dict(batch_ms, size=batch_size),
+        'batch_row_us': round(batch_ms['p50'] * 1000 / batch_size, 3)
+    }
+
+def build_model_report(models, X):
+    """Report for each fitted model; X supplies realistic rows for latency measurements"""
+    report = {}
+    for name, model in models.items():
+        entry = {
+            'class': type(model).__name__,
+            'serialized_bytes': serialized_bytes(model),
+            'in_memory_bytes': in_memory_bytes(model)
+        }
+        trees = tree_stats(model)
+        if trees:
+            entry['trees'] = trees
+        entry.update(measure_latency(model, X))
+        report[name] = entry
+    return report
+
+def model_score(metrics):
+    """Accuracy used to rank models: cross-validated when available, else holdout"""
+    return metrics.get('cv_accuracy_mean', metrics.get('accuracy', 0.0))
+
+def choose_default_model(report, metrics, budget_ms=LATENCY_BUDGET_MS):
+    """
+    Most accurate model whose p95 single-row latency fits the budget
+    Ties go to the faster model; if nothing fits, the fastest model wins
+    """
+    def p95(name):
+        return report[name]['single_row_ms']['p95']
+
+    within = [name for name in report if p95(name) <= budget_ms]
+    if within:
+        return max(within, key=lambda name: (model_score(metrics.get(name, {})), -p95(name)))
+    return min(report, key=p95)
+
+def print_report(report, default_model=None):
+    print(f"{'model':<16} {'disk KB':>9} {'mem KB':>9} {'nodes':>8} {'p50 ms':>8} {'p95 ms':>8} {'batch us/row':>13}")
+    for name, entry in report.items():
+        nodes = entry['trees']['nodes'] if 'trees' in entry else '-'
+        marker = ' *' if name == default_model else ''
+        print(f"{name:<16} {entry['serialized_bytes'] / 1024:>9.1f} {entry['in_memory_bytes'] / 1024:>9.1f} "
+              f"{nodes:>8} {entry['single_row_ms']['p50']:>8.3f} {entry['single_row_ms']['p95']:>8.3f} "
+              f"{entry['batch_row_us']:>13.3f}{marker}")
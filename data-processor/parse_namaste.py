@@ -1,15 +1,14 @@
 """
 Parse NAMASTE Excel files and populate database
-Downloads files from Google Drive links and extracts codes
+Fetches files from Google Drive links (through source_cache) and extracts codes
 """
 
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
+from bulk_loader import merge_rows
 import os
 from dotenv import load_dotenv
-import requests
-from io import BytesIO
+from source_cache import fetch_drive_file
 
 # Load environment variables
 load_dotenv('../backend/.env')
@@ -21,18 +20,6 @@ DRIVE_FILES = {
     'unani': '1AhQeEp3PlEmb1M26MJmKrxtmnLuKHQwY'
 }
 
-def download_from_drive(file_id):
-    """Download file from Google Drive"""
-    url = f"https://drive.google.com/uc?export=download&id={file_id}"
-    
-    print(f"Downloading file {file_id}...")
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        return BytesIO(response.content)
-    else:
-        raise Exception(f"Failed to download file: {response.status_code}")
-
 def parse_excel_file(file_content, system_type):
     """Parse Excel file and extract NAMASTE codes"""
     print(f"Parsing {system_type} Excel file...")
@@ -140,33 +127,25 @@ def insert_namaste_codes(conn, codes):
         return 0
     
     cursor = conn.cursor()
-    
-    # Clear existing codes for this system
     system_type = codes[0]['system_type']
-    cursor.execute("DELETE FROM namaste_codes WHERE system_type = %s", (system_type,))
-    print(f"Cleared existing {system_type} codes")
     
     # Prepare data for insertion
-    values = [
+    values = (
         (c['code'], c['display'], c['system_type'], c['definition'])
         for c in codes
-    ]
-    
-    # Insert new codes
-    insert_query = """
-        INSERT INTO namaste_codes (code, display, system_type, definition)
-        VALUES %s
-        ON CONFLICT (code) DO UPDATE SET
-            display = EXCLUDED.display,
-            definition = EXCLUDED.definition,
-            updated_at = NOW()
-    """
+    )
     
-    execute_values(cursor, insert_query, values)
+    # Replace this system's codes in one transaction: codes that are still in
+    # the release keep their ids (and mappings), the rest are removed
+    stats = merge_rows(
+        cursor, 'namaste_codes', ('code', 'display', 'system_type', 'definition'), values,
+        key=('code',), update=('display', 'definition'), touch='updated_at',
+        replace_where={'system_type': system_type}
+    )
     conn.commit()
     
-    inserted_count = cursor.rowcount
-    print(f"Inserted/Updated {inserted_count} {system_type} codes")
+    inserted_count = stats['merged']
+    print(f"Inserted/Updated {inserted_count} {system_type} codes, removed {stats['deleted']}")
     
     cursor.close()
     return inserted_count
@@ -184,8 +163,8 @@ def main():
         try:
             print(f"\nProcessing {system_type.upper()}...")
             
-            # Download file
-            file_content = download_from_drive(file_id)
+            # Fetch file (cached after the first download)
+            file_content = fetch_drive_file(file_id, '.xlsx')
             
             # Parse Excel
             codes = parse_excel_file(file_content, system_type)
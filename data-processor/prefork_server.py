@@ -0,0 +1,174 @@
+"""
+Pre-forking WSGI server for the Python services
+The master process loads everything once, binds the listening socket and
+forks workers that share the loaded memory copy-on-write. Each worker runs a
+threaded werkzeug server on the inherited socket.
+"""
+
+import gc
+import os
+import signal
+import socket
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+# Thread pools that would otherwise each size themselves to every core
+THREAD_LIMIT_ENV_VARS = [
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS'
+]
+
+class InFlightTracker:
+    """WSGI middleware counting requests in progress so shutdown can drain them"""
+
+    def __init__(self, app):
+        self.app = app
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.active += 1
+        try:
+            return self.app(environ, start_response)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+def limit_worker_threads(num_threads):
+    """Cap BLAS/OpenMP threads in this process so workers don't oversubscribe cores"""
+    for name in THREAD_LIMIT_ENV_VARS:
+        os.environ[name] = str(num_threads)
+
+    # numpy is already imported in the master, so its pools must be resized at runtime
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=num_threads)
+    except ImportError:
+        pass
+
+def bind_socket(host, port, backlog=128):
+    """Create the listening socket shared by all workers"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(app, sock, host, port, worker_id, num_threads, on_worker_start, shutdown_timeout):
+    """Serve requests in a forked worker until SIGTERM, then drain in-flight requests"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    limit_worker_threads(num_threads)
+
+    tracker = InFlightTracker(app)
+    server = make_server(host, port, tracker, threaded=True, fd=sock.fileno())
+
+    def handle_term(signum, frame):
+        # shutdown() blocks until serve_forever() returns, so it cannot run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, handle_term)
+
+    if on_worker_start:
+        on_worker_start(worker_id)
+
+    print(f"Worker {worker_id} (pid {os.getpid()}) serving with {num_threads} BLAS thread(s)")
+    server.serve_forever()
+
+    deadline = time.monotonic() + shutdown_timeout
+    while tracker.active and time.monotonic() < deadline:
+        time.sleep(0.05)
+    server.server_close()
+    print(f"Worker {worker_id} (pid {os.getpid()}) stopped")
+
+def serve_prefork(app, host, port, workers, num_threads=None, on_worker_start=None, shutdown_timeout=30):
+    """
+    Fork `workers` processes serving `app` and supervise them
+    Everything the caller loaded before this call is shared copy-on-write.
+    Dead workers are restarted; SIGTERM/SIGINT stop all workers gracefully.
+    """
+    if num_threads is None:
+        num_threads = max(1, (os.cpu_count() or 1) // workers)
+
+    sock = bind_socket(host, port)
+
+    # Keep the garbage collector from touching (and so copying) preloaded objects
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+
+    def spawn(worker_id):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                run_worker(app, sock, host, port, worker_id, num_threads, on_worker_start, shutdown_timeout)
+            except Exception as e:
+                print(f"Worker {worker_id} crashed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children[pid] = worker_id
+
+    stopping = threading.Event()
+
+    def handle_stop(signum, frame):
+        stopping.set()
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    print(f"Master (pid {os.getpid()}) listening on http://{host}:{port} with {workers} workers")
+    for worker_id in range(workers):
+        spawn(worker_id)
+
+    # Supervise: reap exited workers and replace them until asked to stop
+    while not stopping.is_set():
+        stopping.wait(0.5)
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            worker_id = children.pop(pid, None)
+            if worker_id is not None and not stopping.is_set():
+                print(f"Worker {worker_id} (pid {pid}) exited with status {status}, restarting")
+                spawn(worker_id)
+
+    print("Shutting down workers...")
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    deadline = time.monotonic() + shutdown_timeout
+    while children and time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            children.pop(pid, None)
+        else:
+            time.sleep(0.1)
+
+    for pid in children:
+        print(f"Worker pid {pid} did not stop in time, killing")
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+
+    sock.close()
+    print("All workers stopped")
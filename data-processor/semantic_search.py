@@ -10,6 +10,7 @@ import psycopg2
 import json
 import os
 from dotenv import load_dotenv
+from concept_matching import save_embedding_matrices
 
 load_dotenv('../backend/.env')
 
@@ -104,6 +105,10 @@ def generate_embeddings_for_codes():
     
     print(f"✅ Embeddings saved! File size: {os.path.getsize(output_file) / 1024 / 1024:.2f} MB")
     
+    # Memory-mappable copies for the concept mapper's semantic stage
+    paths = save_embedding_matrices(namaste_ids, namaste_embeddings, icd11_ids, icd11_embeddings)
+    print(f"✅ Embedding matrices saved to {paths['namaste']} and {paths['icd11']}")
+    
     cur.close()
     conn.close()
     
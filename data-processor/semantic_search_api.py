@@ -1,45 +1,72 @@
 """
 API helper for semantic search - called from Node.js
+Run with --serve to keep the model and embeddings loaded and expose /metrics
 """
 
+import os
 import sys
 import json
+import time
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
+from service_metrics import ServiceMetrics
 
 # Load model (cached globally)
 model = None
 
+# Embeddings are only kept between calls in --serve mode
+embeddings_cache = None
+
+# Stage timings for encoding, similarity and serialization
+metrics = ServiceMetrics('semantic_search')
+
 def get_model():
     global model
     if model is None:
+        start = time.perf_counter()
         model = SentenceTransformer('pritamdeka/S-PubMedBert-MS-MARCO')
+        metrics.model_load.set(round(time.perf_counter() - start, 4), model='S-PubMedBert-MS-MARCO', version='')
     return model
 
-def semantic_search_api(query, search_type, top_k):
+def load_embeddings(keep=False):
+    """Read embeddings.json, optionally keeping it for later calls"""
+    global embeddings_cache
+    if embeddings_cache is not None:
+        return embeddings_cache
+    
+    with metrics.stage('load_embeddings'):
+        with open('embeddings.json', 'r') as f:
+            embeddings_data = json.load(f)
+    
+    if keep:
+        embeddings_cache = embeddings_data
+    return embeddings_data
+
+def semantic_search_api(query, search_type, top_k, keep_embeddings=False):
     """
     Perform semantic search and return JSON results
     """
     # Load embeddings
-    with open('embeddings.json', 'r') as f:
-        embeddings_data = json.load(f)
+    embeddings_data = load_embeddings(keep_embeddings)
     
     # Get model
     model = get_model()
     
     # Generate query embedding
-    query_embedding = model.encode([query])[0]
-    
-    # Get corpus embeddings
-    corpus_embeddings = np.array(embeddings_data[search_type]['embeddings'])
-    corpus_ids = embeddings_data[search_type]['ids']
+    with metrics.stage('encode'):
+        query_embedding = model.encode([query])[0]
     
-    # Calculate similarities
-    similarities = cosine_similarity([query_embedding], corpus_embeddings)[0]
-    
-    # Get top-k
-    top_indices = np.argsort(similarities)[-top_k:][::-1]
+    with metrics.stage('similarity'):
+        # Get corpus embeddings
+        corpus_embeddings = np.array(embeddings_data[search_type]['embeddings'])
+        corpus_ids = embeddings_data[search_type]['ids']
+        
+        # Calculate similarities
+        similarities = cosine_similarity([query_embedding], corpus_embeddings)[0]
+        
+        # Get top-k
+        top_indices = np.argsort(similarities)[-top_k:][::-1]
     
     results = []
     for idx in top_indices:
@@ -50,7 +77,50 @@ def semantic_search_api(query, search_type, top_k):
     
     return results
 
+def serve(port):
+    """Long-running HTTP mode with /search, /health and /metrics"""
+    from flask import Flask, request, jsonify
+    
+    app = Flask(__name__)
+    metrics.instrument(app)
+    
+    @app.route('/search', methods=['GET'])
+    def search():
+        query = request.args.get('query', '')
+        search_type = request.args.get('type', 'namaste')
+        try:
+            top_k = min(max(int(request.args.get('limit', 10)), 1), 50)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        
+        if search_type not in ('namaste', 'icd11'):
+            return jsonify({'error': f'Unknown search type {search_type}'}), 400
+        
+        results = semantic_search_api(query, search_type, top_k, keep_embeddings=True)
+        with metrics.stage('serialize'):
+            return jsonify(results)
+    
+    @app.route('/health', methods=['GET'])
+    def health():
+        return jsonify({
+            'status': 'healthy',
+            'service': 'Semantic Search API',
+            'model_loaded': model is not None,
+            'embeddings_loaded': embeddings_cache is not None
+        })
+    
+    # Load everything up front so the first search is not slow
+    get_model()
+    load_embeddings(keep=True)
+    
+    print(f"Starting semantic search server on http://localhost:{port}")
+    app.run(host='0.0.0.0', port=port, debug=False)
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        serve(int(sys.argv[2]) if len(sys.argv) > 2 else int(os.getenv('SEMANTIC_SEARCH_PORT', '5002')))
+        sys.exit(0)
+    
     if len(sys.argv) < 4:
         print(json.dumps({'error': 'Missing arguments'}))
         sys.exit(1)
@@ -62,6 +132,10 @@ if __name__ == '__main__':
     try:
         results = semantic_search_api(query, search_type, top_k)
         print(json.dumps(results))
+        
+        # One-shot calls can't be scraped, so optionally dump their timings to stderr
+        if os.getenv('SEMANTIC_SEARCH_TIMINGS', 'false').lower() == 'true':
+            print(metrics.registry.render(), file=sys.stderr)
     except Exception as e:
         print(json.dumps({'error': str(e)}), file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,223 @@
+"""
+Lightweight Prometheus-format metrics for the Python services
+Counters, gauges and histograms with labels, rendered in the Prometheus text
+exposition format. Updates are a dict lookup plus a short lock, so they are
+cheap enough to leave on in production.
+
+In pre-fork mode every worker keeps its own registry, so a scrape reports the
+worker that served it.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; spans cache hits (sub-millisecond) to cold model loads
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base class for a labelled metric family"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}"]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_sample(self, key, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            labels = format_labels(self.label_names, key, ('le', format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class CallbackMetric(Metric):
+    """Metric whose samples are read from a callback at scrape time"""
+
+    def __init__(self, name, help_text, kind, callback, labels=()):
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self.callback = callback
+
+    def render(self):
+        samples = self.callback()
+        if not isinstance(samples, dict):
+            samples = {(): samples}
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(samples.items()):
+            lines.append(f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}")
+        return lines
+
+class Registry:
+    """Collection of metrics rendered together by /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def callback(self, name, help_text, kind, callback, labels=()):
+        return self.register(CallbackMetric(name, help_text, kind, callback, labels))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+class ServiceMetrics:
+    """Standard HTTP and pipeline-stage metrics for one service"""
+
+    def __init__(self, prefix, registry=None):
+        self.registry = registry or Registry()
+        self.requests = self.registry.counter(
+            f'{prefix}_requests_total', 'HTTP requests handled', ('route', 'method', 'status'))
+        self.latency = self.registry.histogram(
+            f'{prefix}_request_duration_seconds', 'HTTP request latency', ('route', 'method'))
+        self.in_flight = self.registry.gauge(
+            f'{prefix}_requests_in_flight', 'HTTP requests currently being handled')
+        self.stages = self.registry.histogram(
+            f'{prefix}_stage_duration_seconds', 'Time spent in each pipeline stage', ('stage', 'model'))
+        self.model_load = self.registry.gauge(
+            f'{prefix}_model_load_seconds', 'Time taken to load each model', ('model', 'version'))
+
+    def stage(self, stage, model=''):
+        """Context manager timing one pipeline stage"""
+        return self.stages.time(stage=stage, model=model)
+
+    def instrument(self, app, path='/metrics'):
+        """Time every Flask request and serve the registry at `path`"""
+        # Imported here so command-line users of this module don't pay for Flask
+        from flask import Response, g, request
+
+        @app.before_request
+        def start_timer():
+            g.metrics_start = time.perf_counter()
+            g.metrics_in_flight = True
+            self.in_flight.inc()
+
+        @app.after_request
+        def record_request(response):
+            start = g.pop('metrics_start', None)
+            if start is not None:
+                route = request.url_rule.rule if request.url_rule else 'unmatched'
+                self.latency.observe(time.perf_counter() - start, route=route, method=request.method)
+                self.requests.inc(route=route, method=request.method, status=response.status_code)
+            return response
+
+        @app.teardown_request
+        def finish_request(error=None):
+            if g.pop('metrics_in_flight', False):
+                self.in_flight.dec()
+
+        def metrics_endpoint():
+            return Response(self.registry.render(), content_type=CONTENT_TYPE)
+
+        app.add_url_rule(path, 'metrics', metrics_endpoint, methods=['GET'])
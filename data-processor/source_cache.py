@@ -0,0 +1,131 @@
+"""
+Shared fetch layer for the source files (NAMASTE spreadsheets, WHO PDFs)
+Downloads are streamed in chunks into a content-addressed cache
+(objects/<sha256>.<ext>), with an index from source id to checksum, so each
+file is downloaded once and verified every time it is reused.
+
+Offline mode: set SOURCE_DIR to a directory (or test fixtures) holding
+<file id>.<ext> files and they are used as they are; set SOURCES_OFFLINE=1
+to fail instead of downloading when a file is in neither place.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+from model_bundle import file_sha256
+
+SOURCE_CACHE_DIR = Path(os.getenv('SOURCE_CACHE_DIR', Path(__file__).parent.parent / 'data' / 'sources'))
+SOURCE_DIR = os.getenv('SOURCE_DIR')
+OFFLINE = os.getenv('SOURCES_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+DOWNLOAD_CHUNK_BYTES = 1 << 20
+DOWNLOAD_TIMEOUT_SECONDS = 60
+
+def drive_url(file_id):
+    return f"https://drive.google.com/uc?export=download&id={file_id}"
+
+def read_index(cache_dir=SOURCE_CACHE_DIR):
+    """{source id: {'sha256', 'bytes', 'suffix', 'url', 'fetched_at'}}"""
+    path = Path(cache_dir) / 'index.json'
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_index(index, cache_dir=SOURCE_CACHE_DIR):
+    """Replace the index atomically so a crashed run never leaves it half-written"""
+    cache_dir = Path(cache_dir)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.index-', suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, cache_dir / 'index.json')
+
+def object_path(sha256, suffix, cache_dir=SOURCE_CACHE_DIR):
+    return Path(cache_dir) / 'objects' / f"{sha256}{suffix}"
+
+def local_source(source_id, suffix, source_dir=SOURCE_DIR):
+    """<source id><suffix> from the offline directory, if there is one"""
+    if not source_dir:
+        return None
+    path = Path(source_dir) / f"{source_id}{suffix}"
+    return path if path.exists() else None
+
+def download(url, cache_dir=SOURCE_CACHE_DIR, suffix=''):
+    """Stream url into the object store; returns (path, sha256, bytes)"""
+    cache_dir = Path(cache_dir)
+    (cache_dir / 'objects').mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    start = time.perf_counter()
+
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir / 'objects', prefix='.download-')
+    try:
+        with os.fdopen(fd, 'wb') as f, requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS) as response:
+            if response.status_code != 200:
+                raise Exception(f"Failed to download {url}: {response.status_code}")
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        sha256 = digest.hexdigest()
+        path = object_path(sha256, suffix, cache_dir)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    seconds = time.perf_counter() - start
+    print(f"Downloaded {size / 1024 / 1024:.1f} MB in {seconds:.1f}s")
+    return path, sha256, size
+
+def fetch_source(source_id, url, suffix='', sha256=None, refresh=False,
+                 cache_dir=SOURCE_CACHE_DIR, source_dir=SOURCE_DIR, offline=OFFLINE):
+    """
+    Local path of a source file: from the offline directory, else from the
+    cache (checksum verified), else downloaded into the cache
+    sha256 pins the expected content; a download that doesn't match is rejected
+    """
+    local = local_source(source_id, suffix, source_dir)
+    if local:
+        print(f"Using local {local}")
+        return local
+
+    index = read_index(cache_dir)
+    entry = index.get(source_id)
+    if entry and not refresh and (sha256 is None or entry['sha256'] == sha256):
+        path = object_path(entry['sha256'], entry['suffix'], cache_dir)
+        if path.exists() and file_sha256(path) == entry['sha256']:
+            print(f"Using cached {source_id} ({entry['bytes'] / 1024 / 1024:.1f} MB)")
+            return path
+        print(f"Cached copy of {source_id} is missing or corrupt; fetching it again")
+
+    if offline:
+        raise FileNotFoundError(f"{source_id}{suffix} is not in SOURCE_DIR or the cache and SOURCES_OFFLINE is set")
+
+    print(f"Downloading {source_id}...")
+    path, actual, size = download(url, cache_dir, suffix)
+    if sha256 is not None and actual != sha256:
+        raise Exception(f"Checksum mismatch for {source_id}: expected {sha256}, got {actual}")
+
+    # Re-read: another run may have updated the index meanwhile
+    index = read_index(cache_dir)
+    index[source_id] = {
+        'sha256': actual,
+        'bytes': size,
+        'suffix': suffix,
+        'url': url,
+        'fetched_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    }
+    write_index(index, cache_dir)
+    return path
+
+def fetch_drive_file(file_id, suffix, **kwargs):
+    """Local path of a Google Drive file, fetched through the source cache"""
+    return fetch_source(file_id, drive_url(file_id), suffix, **kwargs)
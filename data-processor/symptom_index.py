@@ -0,0 +1,146 @@
+"""
+Autocomplete index over symptom names and aliases
+A prefix trie answers "starts with" lookups on whole names and on each word;
+a trigram index catches typos when the trie has too few matches.
+Both are built once per model bundle, so a lookup is a few dict walks.
+"""
+
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+
+# Optional {symptom_column: [alias, ...]} file for lay terms and spellings
+BASE_DIR = Path(__file__).parent.parent
+ALIASES_FILE = BASE_DIR / 'data' / 'symptom_aliases.json'
+
+# Trie nodes keep at most this many candidates; more than any client shows
+MAX_NODE_CANDIDATES = 64
+
+# Minimum trigram similarity for a typo-tolerant match
+MIN_FUZZY_SCORE = 0.3
+
+def readable_symptom(column):
+    """Display form of a symptom column, as served by /symptoms"""
+    return column.replace('_', ' ').title()
+
+def normalize(text):
+    """Lowercase and collapse everything that is not a letter or digit to single spaces"""
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def load_aliases(path=ALIASES_FILE):
+    if not Path(path).exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class SymptomSearchIndex:
+    """Ranked prefix and typo-tolerant lookups over a fixed symptom list"""
+
+    def __init__(self, symptom_columns, aliases=None):
+        aliases = aliases or {}
+        self.columns = list(symptom_columns)
+        self.display = [readable_symptom(column) for column in self.columns]
+
+        # Every searchable key: (normalized text, entry id, is alias)
+        self.keys = []
+        for entry_id, column in enumerate(self.columns):
+            self.keys.append((normalize(column), entry_id, False))
+            for alias in aliases.get(column, []):
+                self.keys.append((normalize(alias), entry_id, True))
+
+        self._build_trie()
+        self._build_trigrams()
+
+    def _build_trie(self):
+        # Each node is {'children': {char: node}, 'hits': [(rank, entry_id)]}
+        self.trie = {'children': {}, 'hits': []}
+        for key_id, (key, entry_id, is_alias) in enumerate(self.keys):
+            words = key.split(' ')
+            for word_pos in range(len(words)):
+                suffix = ' '.join(words[word_pos:])
+                # Matches at the start of the name rank above matches on a later word
+                rank = (0 if word_pos == 0 else 1, 1 if is_alias else 0, len(key), entry_id)
+                node = self.trie
+                for char in suffix:
+                    node = node['children'].setdefault(char, {'children': {}, 'hits': []})
+                    node['hits'].append((rank, entry_id))
+
+        # Sort and de-duplicate candidates once so lookups only slice
+        stack = [self.trie]
+        while stack:
+            node = stack.pop()
+            best = {}
+            for rank, entry_id in sorted(node['hits']):
+                best.setdefault(entry_id, rank)
+            node['hits'] = sorted((rank, entry_id) for entry_id, rank in best.items())[:MAX_NODE_CANDIDATES]
+            stack.extend(node['children'].values())
+
+    def _build_trigrams(self):
+        self.gram_index = defaultdict(list)
+        self.gram_counts = []
+        for key_id, (key, entry_id, is_alias) in enumerate(self.keys):
+            grams = trigrams(key)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.gram_index[gram].append(key_id)
+
+    def prefix_matches(self, query):
+        node = self.trie
+        for char in query:
+            node = node['children'].get(char)
+            if node is None:
+                return []
+        return node['hits']
+
+    def fuzzy_matches(self, query):
+        """Entries whose keys share enough trigrams with the query (Jaccard)"""
+        query_grams = trigrams(query)
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for key_id in self.gram_index.get(gram, ()):
+                shared[key_id] += 1
+
+        best = {}
+        for key_id, count in shared.items():
+            score = count / (len(query_grams) + self.gram_counts[key_id] - count)
+            entry_id = self.keys[key_id][1]
+            if score >= MIN_FUZZY_SCORE and score > best.get(entry_id, 0.0):
+                best[entry_id] = score
+        return sorted(best.items(), key=lambda item: (-item[1], item[0]))
+
+    def suggest(self, query, limit=10):
+        """Ranked suggestions: name prefixes, then word prefixes, then typo matches"""
+        query = normalize(query)
+        if not query:
+            return []
+
+        results = []
+        seen = set()
+        for (position, is_alias, length, entry_id) in (rank for rank, _ in self.prefix_matches(query)):
+            if len(results) >= limit:
+                break
+            seen.add(entry_id)
+            results.append(self._suggestion(entry_id, 'prefix', 1.0 if position == 0 else 0.9))
+
+        if len(results) < limit:
+            for entry_id, score in self.fuzzy_matches(query):
+                if len(results) >= limit:
+                    break
+                if entry_id not in seen:
+                    seen.add(entry_id)
+                    results.append(self._suggestion(entry_id, 'fuzzy', round(score * 0.8, 3)))
+
+        return results
+
+    def _suggestion(self, entry_id, match, score):
+        return {
+            'symptom': self.display[entry_id],
+            'key': self.columns[entry_id],
+            'match': match,
+            'score': score
+        }
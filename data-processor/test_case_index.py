@@ -0,0 +1,74 @@
+"""
+Brute-force equivalence checks for the packed-bitset case index
+Run with pytest, or directly: python test_case_index.py
+"""
+
+import numpy as np
+
+import case_index
+from case_index import build_case_index, case_indices, nearest_cases, pack_indices
+
+def brute_force_scores(cases, query_row, metric):
+    """Scores of every case computed on the unpacked 0/1 matrix"""
+    shared = (cases & query_row).sum(axis=1)
+    union = (cases | query_row).sum(axis=1)
+    if metric == 'hamming':
+        return (cases != query_row).sum(axis=1), shared
+    return np.divide(shared, union, out=np.zeros(len(cases)), where=union > 0), shared
+
+def check_nearest(cases, query, k, metric):
+    n_columns = cases.shape[1]
+    case_bits, case_counts = build_case_index(cases)
+    query_row = np.zeros(n_columns, dtype=bool)
+    query_row[list(query)] = True
+
+    indices, scores, shared = nearest_cases(case_bits, case_counts, pack_indices(query, n_columns), k, metric)
+    expected, expected_shared = brute_force_scores(cases, query_row, metric)
+    best = np.sort(expected)[:k] if metric == 'hamming' else -np.sort(-expected)[:k]
+
+    # Binary data is full of ties, so the k best scores are compared rather
+    # than which of the tied cases were picked
+    assert len(set(indices.tolist())) == len(indices) == min(k, len(cases))
+    assert np.allclose(scores, best)
+    assert np.allclose(scores, expected[indices])
+    assert np.array_equal(shared, expected_shared[indices])
+    for (score, index), (next_score, next_index) in zip(zip(scores, indices), zip(scores[1:], indices[1:])):
+        if score == next_score:
+            assert index < next_index
+
+def test_nearest_cases_matches_brute_force():
+    rng = np.random.default_rng(34)
+    # Column counts on both sides of a 64-bit word boundary
+    for n_columns in (5, 64, 131):
+        cases = rng.random((500, n_columns)) < 0.1
+        for _ in range(40):
+            query = rng.choice(n_columns, rng.integers(1, min(8, n_columns)), replace=False)
+            for metric in ('jaccard', 'hamming'):
+                for k in (1, 5, 600):
+                    check_nearest(cases, query, k, metric)
+
+def test_nearest_cases_across_blocks():
+    rng = np.random.default_rng(340)
+    cases = rng.random((1000, 70)) < 0.15
+    block_cases = case_index.BLOCK_CASES
+    case_index.BLOCK_CASES = 97
+    try:
+        for _ in range(40):
+            query = rng.choice(70, rng.integers(1, 10), replace=False)
+            for metric in ('jaccard', 'hamming'):
+                check_nearest(cases, query, 10, metric)
+    finally:
+        case_index.BLOCK_CASES = block_cases
+
+def test_case_indices_round_trip():
+    rng = np.random.default_rng(341)
+    cases = rng.random((50, 131)) < 0.2
+    case_bits, _ = build_case_index(cases)
+    for case_id in range(len(cases)):
+        assert np.array_equal(case_indices(case_bits, case_id, 131), np.flatnonzero(cases[case_id]))
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
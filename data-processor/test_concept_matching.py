@@ -0,0 +1,118 @@
+"""
+Brute-force equivalence checks for the indexed concept matchers
+Run with pytest, or directly: python test_concept_matching.py
+"""
+
+import random
+
+import numpy as np
+
+from concept_matching import KEYWORD_THRESHOLD, KeywordIndex, RuleMatcher, load_rules, normalize_text, top_k_similar
+
+VOCABULARY = ['fever', 'cough', 'chronic', 'acute', 'pain', 'joint', 'skin',
+              'disorder', 'of', 'the', 'jwara', 'kasa', 'vata', 'headache']
+
+def random_phrase(rng, max_words=5):
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(1, max_words))]
+    # Mixed case and extra spaces, as in the source data
+    return '  '.join(w.upper() if rng.random() < 0.2 else w for w in words)
+
+def brute_force_keywords(display, icd11_codes, threshold=KEYWORD_THRESHOLD):
+    """The original pairwise keyword scorer"""
+    best_match, best_score = None, 0.0
+    namaste_words = set(display.lower().split())
+    for icd11 in icd11_codes:
+        common = namaste_words & set(icd11['title'].lower().split())
+        if common:
+            score = len(common) / max(len(namaste_words), len(set(icd11['title'].lower().split())))
+            if score > best_score:
+                best_match, best_score = icd11['code'], score
+    if best_score > threshold:
+        return best_match, float(best_score)
+    return None, 0.0
+
+def test_keyword_index_matches_brute_force():
+    rng = random.Random(40)
+    icd11_codes = [{'code': f"IC{i:03d}", 'title': random_phrase(rng)} for i in range(300)]
+    index = KeywordIndex(icd11_codes)
+    for _ in range(2000):
+        display = random_phrase(rng)
+        assert index.best_match(display) == brute_force_keywords(display, icd11_codes), display
+
+def test_keyword_index_without_shared_words():
+    index = KeywordIndex([{'code': 'IC001', 'title': 'Fever'}])
+    assert index.best_match('cough') == (None, 0.0)
+    assert KeywordIndex([]).best_match('fever') == (None, 0.0)
+
+def random_rules(rng, count=150, alphabet='abc '):
+    rules = []
+    for order in range(count):
+        term = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))).strip() or 'a'
+        rules.append({'term': term, 'icd_code': f"R{order:03d}", 'priority': rng.randint(0, 2),
+                      'confidence': 0.95, 'order': order})
+    return rules
+
+def brute_force_find_all(rules, display):
+    """(rule order, end offset) of every occurrence of every rule term, overlaps included"""
+    text = normalize_text(display)
+    found = []
+    for rule in rules:
+        start = text.find(rule['term'])
+        while start != -1:
+            found.append((rule['order'], start + len(rule['term'])))
+            start = text.find(rule['term'], start + 1)
+    return sorted(found)
+
+def brute_force_rule(rules, display):
+    text = normalize_text(display)
+    matching = [rule for rule in rules if rule['term'] in text]
+    if not matching:
+        return None, 0.0
+    rule = min(matching, key=lambda r: (-r['priority'], -len(r['term']), r['order']))
+    return rule['icd_code'], rule['confidence']
+
+def test_rule_matcher_matches_brute_force():
+    # A tiny alphabet gives many overlapping and nested terms
+    rng = random.Random(41)
+    rules = random_rules(rng)
+    matcher = RuleMatcher(rules)
+    for _ in range(2000):
+        display = ''.join(rng.choice('abcAB ') for _ in range(rng.randint(0, 30)))
+        found = sorted((rule['order'], end) for rule, end in matcher.find_all(display))
+        assert found == brute_force_find_all(rules, display), display
+        assert matcher.best_match(display) == brute_force_rule(rules, display), display
+
+def test_rule_matcher_with_rules_file():
+    rules = load_rules()
+    matcher = RuleMatcher(rules)
+    rng = random.Random(410)
+    terms = [rule['term'] for rule in rules]
+    for _ in range(500):
+        display = ' '.join(rng.choice(terms + VOCABULARY) for _ in range(rng.randint(1, 4)))
+        assert matcher.best_match(display) == brute_force_rule(rules, display), display
+
+def brute_force_top_k(queries, corpus, k, query_rows):
+    """Full similarity matrix, sorted best first with ties in corpus order"""
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    similarity = queries[query_rows] @ corpus.T
+    order = np.array([np.lexsort((np.arange(len(corpus)), -row))[:k] for row in similarity])
+    return order, np.take_along_axis(similarity, order, axis=1)
+
+def test_top_k_similar_matches_brute_force():
+    rng = np.random.default_rng(45)
+    queries = rng.normal(size=(57, 16)).astype(np.float32)
+    corpus = rng.normal(size=(101, 16)).astype(np.float32)
+    query_rows = rng.choice(len(queries), 30, replace=False)
+    # Blocks smaller than k, uneven last blocks, and k larger than the corpus
+    for k, block_rows, block_cols in ((1, 7, 13), (5, 7, 13), (20, 64, 3), (150, 8, 40)):
+        indices, scores = top_k_similar(queries, corpus, k, query_rows, block_rows, block_cols)
+        expected_indices, expected_scores = brute_force_top_k(queries, corpus, min(k, len(corpus)), query_rows)
+        assert np.array_equal(indices, expected_indices), (k, block_rows, block_cols)
+        assert np.allclose(scores, expected_scores, atol=1e-5), (k, block_rows, block_cols)
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,76 @@
+"""
+Checks that sharded, parallel concept scoring gives the serial result
+Run with pytest, or directly: python test_concept_scoring.py
+"""
+
+import random
+import uuid
+
+import concept_scoring
+from concept_matching import load_rules
+from concept_scoring import create_mappings, shard_codes
+
+SYSTEMS = ['ayurveda', 'siddha', 'unani']
+
+TITLES = [
+    ('MG26', 'Fever, unspecified', 'Biomedicine'),
+    ('CA23', 'Chronic cough', 'Biomedicine'),
+    ('FA20', 'Joint pain disorder', 'Biomedicine'),
+    ('QA02.0', 'Vata imbalance pattern', 'TM2'),
+    ('QA02.4', 'Ama accumulation pattern', 'TM2'),
+    ('TM2-101', 'Jvara', 'TM2'),
+    ('TM2-102', 'Kasa roga', 'TM2'),
+    ('TM2-103', 'Amavata', 'TM2'),
+]
+
+WORDS = ['jwara', 'jvara', 'kaasa', 'kasah', 'vaata', 'amavaata', 'shotha', 'chronic',
+         'pain', 'joint', 'fever', 'roga', 'vyadhi', 'pitta', 'disorder', 'xyz']
+
+def sample_codes(rng, count):
+    terms = [rule['term'] for rule in load_rules()]
+    namaste_codes = []
+    for i in range(count):
+        words = [rng.choice(WORDS + terms) for _ in range(rng.randint(1, 3))]
+        namaste_codes.append({
+            'id': uuid.UUID(int=rng.getrandbits(128)),
+            'code': f"N{i:05d}",
+            'display': ' '.join(words).capitalize(),
+            'system_type': rng.choice(SYSTEMS)
+        })
+    icd11_codes = [
+        {'id': uuid.UUID(int=rng.getrandbits(128)), 'code': code, 'title': title, 'module': module}
+        for code, title, module in TITLES
+    ]
+    return namaste_codes, icd11_codes
+
+def test_shard_codes_covers_every_code_once():
+    namaste_codes, _ = sample_codes(random.Random(45), 500)
+    for shards_per_system in (1, 3, 16):
+        shards = shard_codes(namaste_codes, shards_per_system)
+        ids = [namaste_id for shard in shards.values() for namaste_id, _ in shard]
+        assert sorted(ids) == sorted(n['id'] for n in namaste_codes)
+        by_id = {n['id']: n for n in namaste_codes}
+        for (system_type, bucket), shard in shards.items():
+            assert 0 <= bucket < shards_per_system
+            assert all(by_id[namaste_id]['system_type'] == system_type for namaste_id, _ in shard)
+
+def test_parallel_mappings_match_serial():
+    namaste_codes, icd11_codes = sample_codes(random.Random(450), 600)
+    only_ids = {n['id'] for n in namaste_codes[::3]}
+    parallel_min_codes = concept_scoring.PARALLEL_MIN_CODES
+    # Small enough that the sample goes through the process pool
+    concept_scoring.PARALLEL_MIN_CODES = 10
+    try:
+        for selected in (None, only_ids):
+            serial = create_mappings(namaste_codes, icd11_codes, selected, workers=1)
+            parallel = create_mappings(namaste_codes, icd11_codes, selected, workers=3)
+            assert parallel == serial
+            assert {m['provenance'] for m in serial} == {'rule', 'keyword', 'fuzzy'}
+    finally:
+        concept_scoring.PARALLEL_MIN_CODES = parallel_min_codes
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
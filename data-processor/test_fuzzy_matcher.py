@@ -0,0 +1,82 @@
+"""
+Brute-force equivalence checks for the fuzzy matcher
+Run with pytest, or directly: python test_fuzzy_matcher.py
+"""
+
+import random
+
+from fuzzy_matcher import FuzzyIndex, bounded_edit_distance, fold_transliteration, ngrams
+
+def levenshtein(a, b):
+    """Full dynamic-programming edit distance"""
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        previous = current
+    return previous[-1]
+
+def random_word(rng, alphabet='aeiktshvwjrd', max_length=10):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+
+def brute_force_fuzzy(terms, text, min_jaccard, min_similarity):
+    """Score the query against every term: n-gram Jaccard, then edit similarity"""
+    folded = fold_transliteration(text)
+    if not folded:
+        return None, 0.0
+    for term in terms:
+        if fold_transliteration(term) == folded:
+            return term, 1.0
+
+    query_grams = ngrams(folded)
+    best, best_similarity = None, 0.0
+    for term in terms:
+        other = fold_transliteration(term)
+        if not other:
+            continue
+        grams = ngrams(other)
+        shared = len(query_grams & grams)
+        if shared < min_jaccard * (len(query_grams) + len(grams) - shared):
+            continue
+        longer = max(len(folded), len(other))
+        distance = levenshtein(folded, other)
+        if distance > (1 - min_similarity) * longer + 1e-9:
+            continue
+        similarity = 1 - distance / longer
+        if similarity > best_similarity:
+            best, best_similarity = term, similarity
+    return best, best_similarity
+
+def test_bounded_edit_distance_matches_levenshtein():
+    rng = random.Random(44)
+    for _ in range(20000):
+        a, b = random_word(rng, 'abcd'), random_word(rng, 'abcd')
+        bound = rng.randint(0, 6)
+        distance = levenshtein(a, b)
+        assert bounded_edit_distance(a, b, bound) == (distance if distance <= bound else None), (a, b, bound)
+
+def test_fuzzy_index_matches_brute_force():
+    rng = random.Random(440)
+    terms = [random_word(rng) for _ in range(400)]
+    for min_jaccard, min_similarity in ((0.3, 0.8), (0.1, 0.5)):
+        index = FuzzyIndex(terms, min_jaccard=min_jaccard, min_similarity=min_similarity)
+        for _ in range(1000):
+            # Mostly near-misses of indexed terms, so matches are common
+            query = rng.choice(terms)
+            for _ in range(rng.randint(0, 2)):
+                position = rng.randint(0, len(query))
+                query = query[:position] + rng.choice('aeiktshv') + query[position + 1:]
+            assert index.best_match(query) == brute_force_fuzzy(terms, query, min_jaccard, min_similarity), query
+
+def test_fuzzy_index_folds_transliterations():
+    index = FuzzyIndex(['Jvara', 'Kasa'], ['MG26', 'CA23'])
+    assert index.best_match('jwara') == ('MG26', 1.0)
+    assert index.best_match('kaasa') == ('CA23', 1.0)
+    assert index.best_match('') == (None, 0.0)
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -1,72 +1,525 @@
-
-import pandas as pd
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
-from sklearn.model_selection import train_test_split
+import pandas as pd
+from sklearn.model_selection import train_test_split, ParameterGrid, ParameterSampler
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import accuracy_score
-import joblib
+from scipy import sparse
 import json
 from pathlib import Path
+from datetime import datetime, timezone
+from model_bundle import BUNDLE_DIR, BundleError, read_manifest, write_bundle, update_bundle, load_bundle_model
+from case_index import build_case_index
+from model_report import LATENCY_BUDGET_MS, build_model_report, choose_default_model, print_report as print_model_report
+from training_data import TRAINING_FILE, CHUNK_ROWS, load_training_data, load_folds, iter_training_chunks, read_labels
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / 'data'
-TRAINING_FILE = DATA_DIR / 'training_data.csv'
 
-def train_models():
-    print("Loading training data...")
-    df = pd.read_csv(TRAINING_FILE)
+MODEL_NAMES = ['random_forest', 'naive_bayes', 'decision_tree', 'gradient_boost']
+
+ESTIMATORS = {
+    'random_forest': RandomForestClassifier,
+    'naive_bayes': MultinomialNB,
+    'decision_tree': DecisionTreeClassifier,
+    'gradient_boost': GradientBoostingClassifier
+}
+
+# Hyperparameters used when none have been tuned
+DEFAULT_PARAMS = {
+    'random_forest': {'n_estimators': 100},
+    'naive_bayes': {},
+    'decision_tree': {},
+    'gradient_boost': {'n_estimators': 100}
+}
+
+# Candidate values for --tune; sampled when the full grid is larger than --tune-candidates
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [25, 50, 100, 200],
+        'max_depth': [None, 10, 20, 40],
+        'min_samples_leaf': [1, 2, 5],
+        'max_features': ['sqrt', 'log2']
+    },
+    'naive_bayes': {
+        'alpha': [0.01, 0.1, 0.5, 1.0, 2.0]
+    },
+    'decision_tree': {
+        'max_depth': [None, 10, 20, 40],
+        'min_samples_leaf': [1, 2, 5, 10],
+        'criterion': ['gini', 'entropy']
+    },
+    'gradient_boost': {
+        'n_estimators': [25, 50, 100],
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_depth': [2, 3, 5]
+    }
+}
+
+# Estimators that can spread a single fit over several cores
+PARALLEL_ESTIMATORS = {'random_forest'}
+
+# Rows timed per candidate when tuning scores inference latency
+TUNING_LATENCY_ROWS = 50
+
+def make_model(name, n_jobs=None, params=None):
+    """Fresh, unfitted estimator for a model name, with default or tuned hyperparameters"""
+    if name not in ESTIMATORS:
+        raise ValueError(f"Unknown model: {name}")
+    kwargs = dict(DEFAULT_PARAMS[name])
+    kwargs.update(params or {})
+    if name != 'naive_bayes':
+        kwargs['random_state'] = 42
+    if name in PARALLEL_ESTIMATORS:
+        kwargs['n_jobs'] = n_jobs
+    return ESTIMATORS[name](**kwargs)
+
+# Training data shared with pool workers; inherited without copying when forked
+_worker_data = {}
+
+def init_worker(X, y):
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+
+def fit_split(name, fold, train_idx, test_idx, n_jobs=None, params=None):
+    """
+    Fit one model on one split and score it
+    fold is 'holdout' for the train/test split whose model is saved, or the CV fold number
+    """
+    X, y = _worker_data['X'], _worker_data['y']
+    model = make_model(name, n_jobs, params)
+
+    start = time.perf_counter()
+    model.fit(X.iloc[train_idx], y.iloc[train_idx])
+    seconds = time.perf_counter() - start
+
+    acc = accuracy_score(y.iloc[test_idx], model.predict(X.iloc[test_idx]))
+    return name, fold, float(acc), seconds, (model if fold == 'holdout' else None)
+
+def fit_candidate(name, candidate, params, fold, train_idx, test_idx):
+    """
+    Fit one tuning candidate on one fold; returns its accuracy and median
+    single-row predict_proba latency in ms
+    """
+    X, y = _worker_data['X'], _worker_data['y']
+    model = make_model(name, 1, params)
+    model.fit(X.iloc[train_idx], y.iloc[train_idx])
+    acc = accuracy_score(y.iloc[test_idx], model.predict(X.iloc[test_idx]))
+
+    timings = []
+    for row in test_idx[:TUNING_LATENCY_ROWS]:
+        # Same dtype and shape as an API request vector
+        vector = pd.DataFrame(np.asarray(X.iloc[[row]], dtype=np.int64), columns=X.columns)
+        start = time.perf_counter()
+        model.predict_proba(vector)
+        timings.append(time.perf_counter() - start)
+    return name, candidate, fold, float(acc), float(np.median(timings) * 1000)
+
+def split_folds(n_rows, folds):
+    """(fold number, train indices, test indices) for cached test-index folds"""
+    positions = np.arange(n_rows)
+    return [(i, np.setdiff1d(positions, test_idx), test_idx) for i, test_idx in enumerate(folds)]
+
+def plan_splits(X, folds=None):
+    """The saved holdout split plus optional k-fold splits"""
+    positions = np.arange(len(X))
+    train_idx, test_idx = train_test_split(positions, test_size=0.2, random_state=42)
+    splits = [('holdout', train_idx, test_idx)]
+    if folds:
+        splits.extend(split_folds(len(X), folds))
+    return splits
+
+def pool_context():
+    """Prefer fork so workers share the training data instead of unpickling a copy"""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+def run_tasks(X, y, fn, tasks, parallel=False, workers=None, describe=None):
+    """
+    Call fn(*task) for every task, in a fork-based process pool when parallel
+    Tasks should be ordered slowest first so they are not left for the end
+    """
+    if not parallel:
+        init_worker(X, y)
+        return [fn(*task) for task in tasks]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(),
+                             initializer=init_worker, initargs=(X, y)) as pool:
+        futures = [pool.submit(fn, *task) for task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if describe:
+                print(describe(result))
+    return results
+
+def fit_all(X, y, folds=None, parallel=False, workers=None, params=None):
+    """
+    Fit every model on the holdout split (and each CV fold)
+    In parallel mode every (model, split) pair is a separate task in one process
+    pool, so total time approaches that of the slowest single fit
+    Returns {name: fitted holdout model} and {name: metrics}
+    """
+    params = params or {}
+    splits = plan_splits(X, folds)
+    # Slowest models first
+    order = sorted(MODEL_NAMES, key=lambda name: name != 'gradient_boost')
+
+    if parallel:
+        cores = os.cpu_count() or 1
+        workers = workers or min(cores, len(order) * len(splits))
+        # Cores left over once every worker has a task go to estimators that can use them
+        n_jobs = max(1, cores // workers)
+        print(f"Fitting {len(order) * len(splits)} model/split tasks on {workers} worker processes ({n_jobs} core(s) per parallel estimator)...")
+    else:
+        n_jobs = workers
+
+    tasks = [
+        (name, fold, train_idx, test_idx, n_jobs, params.get(name))
+        for name in order for fold, train_idx, test_idx in splits
+    ]
+    results = run_tasks(X, y, fit_split, tasks, parallel, workers,
+                        describe=lambda r: f"  {r[0]} [{r[1]}] done in {r[3]:.2f}s")
+
+    trained = {}
+    metrics = {}
+    for name in MODEL_NAMES:
+        holdout = next(r for r in results if r[0] == name and r[1] == 'holdout')
+        trained[name] = holdout[4]
+        metrics[name] = {
+            'accuracy': round(holdout[2], 4),
+            'fit_seconds': round(holdout[3], 3)
+        }
+        fold_scores = [r[2] for r in results if r[0] == name and r[1] != 'holdout']
+        if fold_scores:
+            metrics[name]['cv_folds'] = len(fold_scores)
+            metrics[name]['cv_accuracy_mean'] = round(float(np.mean(fold_scores)), 4)
+            metrics[name]['cv_accuracy_std'] = round(float(np.std(fold_scores)), 4)
+            metrics[name]['cv_fit_seconds'] = round(sum(r[3] for r in results if r[0] == name and r[1] != 'holdout'), 3)
+    return trained, metrics
+
+def sample_candidates(name, n_candidates):
+    """Candidate hyperparameter sets for one model; the full grid if it is small enough"""
+    grid = ParameterGrid(SEARCH_SPACES[name])
+    if len(grid) <= n_candidates:
+        candidates = list(grid)
+    else:
+        candidates = list(ParameterSampler(SEARCH_SPACES[name], n_candidates, random_state=42))
+    # Always give the current defaults a chance to win
+    defaults = {key: value for key, value in DEFAULT_PARAMS[name].items()}
+    if defaults not in candidates:
+        candidates.append(defaults)
+    return candidates
+
+def tune_models(X, y, folds, n_candidates=12, eta=3, latency_weight=0.002, parallel=False, workers=None):
+    """
+    Successive-halving search over SEARCH_SPACES for every model
+    Each round scores the surviving candidates on every cached fold, training on
+    a growing share of each fold's training rows, and keeps the best 1/eta by
+    mean accuracy - latency_weight * median single-row latency (ms). The last
+    round trains on the full folds.
+    Returns ({name: winning params}, {name: tuning summary})
+    """
+    candidates = {name: sample_candidates(name, n_candidates) for name in MODEL_NAMES}
+    n_rounds = int(np.ceil(np.log(max(len(c) for c in candidates.values())) / np.log(eta))) + 1
+    splits = split_folds(len(X), folds)
+
+    # A fixed shuffle of each fold's training rows, so a round's subsample is a prefix of the next one's
+    rng = np.random.default_rng(42)
+    shuffled = [(fold, rng.permutation(train_idx), test_idx) for fold, train_idx, test_idx in splits]
+    min_rows = 2 * y.nunique()
+
+    if parallel:
+        workers = workers or os.cpu_count() or 1
+
+    alive = {name: list(range(len(c))) for name, c in candidates.items()}
+    history = {name: [] for name in MODEL_NAMES}
+    best = {}
+    for round_number in range(n_rounds):
+        share = float(eta) ** (round_number - (n_rounds - 1))
+        tasks = []
+        for name in sorted(MODEL_NAMES, key=lambda name: name != 'gradient_boost'):
+            for candidate in alive[name]:
+                for fold, train_idx, test_idx in shuffled:
+                    rows = max(min_rows, int(len(train_idx) * share))
+                    tasks.append((name, candidate, candidates[name][candidate], fold, train_idx[:rows], test_idx))
+        rows = max(min_rows, int(len(shuffled[0][1]) * share))
+        print(f"Tuning round {round_number + 1}/{n_rounds}: {len(tasks)} fits on ~{rows} rows per fold")
+        results = run_tasks(X, y, fit_candidate, tasks, parallel, workers)
+
+        scores = {}
+        for name, candidate, fold, acc, latency_ms in results:
+            scores.setdefault((name, candidate), []).append((acc, latency_ms))
+        for name in MODEL_NAMES:
+            ranked = []
+            for candidate in alive[name]:
+                fold_results = np.asarray(scores[(name, candidate)])
+                acc, latency_ms = fold_results[:, 0].mean(), float(np.median(fold_results[:, 1]))
+                ranked.append((acc - latency_weight * latency_ms, acc, latency_ms, candidate))
+            # Best score first; ties keep the lower candidate number
+            ranked.sort(key=lambda item: (-item[0], item[3]))
+            history[name].append({
+                'round': round_number + 1,
+                'rows': rows,
+                'candidates': len(ranked),
+                'best_score': round(float(ranked[0][0]), 4)
+            })
+            keep = max(1, int(np.ceil(len(ranked) / eta))) if round_number < n_rounds - 1 else 1
+            alive[name] = [item[3] for item in ranked[:keep]]
+            best[name] = ranked[0]
+
+    winners = {}
+    summary = {}
+    for name in MODEL_NAMES:
+        score, acc, latency_ms, candidate = best[name]
+        winners[name] = candidates[name][candidate]
+        summary[name] = {
+            'params': winners[name],
+            'cv_accuracy': round(float(acc), 4),
+            'latency_ms': round(latency_ms, 3),
+            'score': round(float(score), 4),
+            'candidates': len(candidates[name]),
+            'rounds': history[name]
+        }
+    return winners, summary
+
+def print_report(metrics):
+    print(f"{'model':<16} {'accuracy':>8} {'cv mean':>8} {'cv std':>7} {'fit s':>8}")
+    for name, m in metrics.items():
+        cv_mean = f"{m['cv_accuracy_mean']:.4f}" if 'cv_accuracy_mean' in m else '-'
+        cv_std = f"{m['cv_accuracy_std']:.4f}" if 'cv_accuracy_std' in m else '-'
+        print(f"{name:<16} {m['accuracy']:>8.4f} {cv_mean:>8} {cv_std:>7} {m['fit_seconds']:>8.2f}")
+
+def print_tuning(summary):
+    print(f"{'model':<16} {'cv acc':>8} {'ms':>7} {'score':>7}  params")
+    for name, s in summary.items():
+        print(f"{name:<16} {s['cv_accuracy']:>8.4f} {s['latency_ms']:>7.3f} {s['score']:>7.4f}  {s['params']}")
+
+def compute_symptom_cooccurrence(X):
+    """
+    Conditional probabilities P(symptom j | symptom i) from symptom co-occurrence counts
+    Returns a sparse matrix with an empty diagonal and the prior P(symptom)
+    """
+    X_sparse = sparse.csr_matrix((np.asarray(X) > 0).astype(np.float32))
+    counts = (X_sparse.T @ X_sparse).tocsr()
+    frequency = counts.diagonal()
+    
+    # Divide each row by how often its symptom occurs at all
+    inverse = np.divide(1.0, frequency, out=np.zeros_like(frequency), where=frequency > 0)
+    conditional = sparse.diags(inverse) @ counts
+    conditional.setdiag(0)
+    conditional.eliminate_zeros()
     
-    # Preprocessing
-    # Remove prognosis from features
-    X = df.drop('prognosis', axis=1)
-    y = df['prognosis']
+    prior = (frequency / max(X_sparse.shape[0], 1)).astype(np.float32)
+    return conditional.astype(np.float32).tocsr(), prior
+
+def stream_naive_bayes(paths, columns, model=None, chunk_rows=CHUNK_ROWS):
+    """
+    partial_fit MultinomialNB over chunked CSV/parquet files
+    Memory use is bounded by one chunk, however many rows the files hold
+    """
+    labels = set()
+    for path in paths:
+        labels |= read_labels(path, chunk_rows)
+
+    if model is None:
+        model = MultinomialNB()
+        classes = sorted(labels)
+    else:
+        # partial_fit would silently ignore rows with labels the model has never seen
+        unseen = labels - set(model.classes_)
+        if unseen:
+            raise ValueError(f"New data has diseases the model doesn't know ({', '.join(sorted(unseen)[:5])}); retrain from scratch")
+        classes = None
+
+    rows = 0
+    for path in paths:
+        for X_chunk, y_chunk in iter_training_chunks(path, columns, chunk_rows):
+            model.partial_fit(X_chunk, y_chunk, classes=classes)
+            rows += len(y_chunk)
+        print(f"  {path}: {rows} rows so far")
+    return model, rows
+
+def load_holdout(columns):
+    """
+    The held-out rows of the training data (same split as train_models) as (X, y),
+    or None when the training data is missing or has other symptom columns
+    """
+    try:
+        data = load_training_data(TRAINING_FILE)
+    except FileNotFoundError:
+        print(f"  {TRAINING_FILE} not found; dropping naive_bayes accuracy and latency from the manifest")
+        return None
+    if list(data.columns) != list(columns):
+        print("  Training data columns differ from the bundle's; dropping naive_bayes accuracy and latency from the manifest")
+        return None
+    X, y = data.frame(), data.labels()
+    _, _, test_idx = plan_splits(X)[0]
+    return X.iloc[test_idx], y.iloc[test_idx]
+
+def update_naive_bayes(paths, chunk_rows=CHUNK_ROWS):
+    """Fold new labelled encounters into the bundle's Naive Bayes model and publish a new version"""
+    manifest = read_manifest(BUNDLE_DIR)
+    if manifest is None:
+        raise BundleError(f"No model bundle in {BUNDLE_DIR}; run a full training first")
+    columns = manifest['symptoms']['columns']
+
+    model = None
+    if 'naive_bayes' in manifest['models']:
+        # Loaded into memory: partial_fit updates the count arrays in place
+        model = load_bundle_model(manifest['models']['naive_bayes'], columns, mmap_mode=None)
+
+    print(f"Updating naive_bayes from bundle v{manifest['version']}...")
+    start = time.perf_counter()
+    model, rows = stream_naive_bayes(paths, columns, model, chunk_rows)
+    seconds = time.perf_counter() - start
+
+    metrics = dict(manifest.get('metrics', {}))
+    nb_metrics = dict(metrics.get('naive_bayes', {}))
+    nb_metrics['samples_seen'] = int(model.class_count_.sum())
+    nb_metrics['incremental_rows'] = nb_metrics.get('incremental_rows', 0) + rows
+    nb_metrics['updated_at'] = datetime.now(timezone.utc).isoformat()
+    # Cross-validation scored the model before the update
+    for key in ('cv_folds', 'cv_accuracy_mean', 'cv_accuracy_std', 'cv_fit_seconds'):
+        nb_metrics.pop(key, None)
+
+    report = dict(manifest.get('model_report', {}))
+    holdout = load_holdout(columns)
+    if holdout is None:
+        # Figures measured on the old model would still drive the default choice
+        nb_metrics.pop('accuracy', None)
+        report.pop('naive_bayes', None)
+    else:
+        X_test, y_test = holdout
+        nb_metrics['accuracy'] = round(float(accuracy_score(y_test, model.predict(X_test))), 4)
+        print(f"  Held-out accuracy: {nb_metrics['accuracy']:.4f}")
+        report['naive_bayes'] = build_model_report({'naive_bayes': model}, X_test)['naive_bayes']
+    metrics['naive_bayes'] = nb_metrics
+
+    extra = {'metrics': metrics, 'model_report': report}
+    if report:
+        budget_ms = manifest.get('default_model_rule', {}).get('latency_budget_ms', LATENCY_BUDGET_MS)
+        extra['default_model'] = choose_default_model(report, metrics, budget_ms)
+        print(f"Default model: {extra['default_model']} (most accurate within {budget_ms:g} ms p95)")
+
+    updated = update_bundle({'naive_bayes': model}, extra=extra)
+    print(f"Added {rows} rows in {seconds:.2f}s; published bundle v{updated['version']} to {BUNDLE_DIR}")
+    return updated
+
+def train_models(cv_folds=0, parallel=False, workers=None, refresh_cache=False, latency_budget_ms=LATENCY_BUDGET_MS,
+                 tune=False, tune_candidates=12, latency_weight=0.002, default_params=False):
+    print("Loading training data...")
+    data = load_training_data(TRAINING_FILE, refresh=refresh_cache)
     
-    # Drop any unnamed columns (artifacts from trailing commas)
-    X = X.loc[:, ~X.columns.str.contains('^Unnamed')]
+    # uint8 symptom matrix, memory-mapped from the cache
+    X = data.frame()
+    y = data.labels()
     
-    symptoms = list(X.columns)
-    print(f"Feature count: {len(symptoms)}")
+    symptoms = data.columns
+    print(f"Feature count: {len(symptoms)}, cases: {len(data)} ({data.X.nbytes / 1024 / 1024:.1f} MB)")
     print(f"Saving symptom list to symptoms.json")
     
     with open(DATA_DIR / 'symptoms.json', 'w') as f:
         json.dump(symptoms, f)
         
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    folds = load_folds(data, cv_folds) if cv_folds > 1 else None
     
-    # Models to train
-    models = {
-        'random_forest': RandomForestClassifier(n_estimators=100, random_state=42),
-        'naive_bayes': MultinomialNB(),
-        'decision_tree': DecisionTreeClassifier(random_state=42),
-        'gradient_boost': GradientBoostingClassifier(n_estimators=100, random_state=42)
-    }
+    previous = read_manifest(BUNDLE_DIR)
+    tuning = None
+    params = {}
+    if tune:
+        print("Tuning hyperparameters...")
+        start = time.perf_counter()
+        params, tuning = tune_models(X, y, folds or load_folds(data, 3), tune_candidates,
+                                     latency_weight=latency_weight, parallel=parallel, workers=workers)
+        print_tuning(tuning)
+        print(f"Tuning wall-clock: {time.perf_counter() - start:.2f}s")
+    elif not default_params and previous and previous.get('hyperparameters'):
+        # Keep configurations found by an earlier --tune run
+        params = previous['hyperparameters']
+        tuning = previous.get('tuning')
+        print(f"Using hyperparameters from bundle v{previous['version']} (--default-params to reset)")
     
     print("Training models...")
-    for name, model in models.items():
-        print(f"Training {name}...")
-        model.fit(X_train, y_train)
-        
-        # Evaluate
-        preds = model.predict(X_test)
-        acc = accuracy_score(y_test, preds)
-        print(f"  Accuracy: {acc:.4f}")
-        
-        # Save
-        save_path = DATA_DIR / f"{name}.joblib"
-        joblib.load = joblib.load # weird fix for some envs? no, not needed usually.
-        joblib.dump(model, save_path)
-        print(f"  Saved to {save_path}")
-        
-        # Verify load
+    start = time.perf_counter()
+    trained, metrics = fit_all(X, y, folds=folds, parallel=parallel, workers=workers, params=params)
+    wall_seconds = time.perf_counter() - start
+    print_report(metrics)
+    print(f"Training wall-clock: {wall_seconds:.2f}s")
+    
+    print("Measuring model footprint and inference latency...")
+    report = build_model_report(trained, X)
+    default_model = choose_default_model(report, metrics, latency_budget_ms)
+    print_model_report(report, default_model)
+    print(f"Default model: {default_model} (most accurate within {latency_budget_ms:g} ms p95)")
+    
+    print("Computing symptom co-occurrence matrix...")
+    conditional, prior = compute_symptom_cooccurrence(data.X)
+    print(f"  {conditional.nnz} non-zero symptom pairs")
+    
+    # Every training encounter, packed for nearest-case lookups
+    case_bits, case_counts = build_case_index(data.X)
+    case_labels = data.y
+    print(f"Packed {len(case_labels)} training cases into {case_bits.nbytes / 1024:.1f} KB of bitsets")
+    
+    # Save all models as one versioned bundle
+    manifest = write_bundle(
+        trained, symptoms,
+        extra={'metrics': metrics, 'training': {
+            'parallel': parallel, 'cv_folds': cv_folds, 'wall_seconds': round(wall_seconds, 3),
+            'source_sha256': data.source_sha256},
+            'model_report': report,
+            'hyperparameters': {name: dict(DEFAULT_PARAMS[name], **params.get(name, {})) for name in MODEL_NAMES},
+            'tuning': tuning,
+            'default_model': default_model,
+            'default_model_rule': {'latency_budget_ms': latency_budget_ms, 'latency': 'single_row_ms.p95'}},
+        artifacts={
+            'symptom_cooccurrence': conditional,
+            'symptom_prior': prior,
+            'case_bits': case_bits,
+            'case_symptom_counts': case_counts,
+            'case_labels': case_labels
+        }
+    )
+    print(f"Saved model bundle v{manifest['version']} to {BUNDLE_DIR}")
+    
+    # Verify load
+    for name, entry in manifest['models'].items():
         try:
-            loaded = joblib.load(save_path)
-            print(f"  Verification: Loaded successfully")
+            load_bundle_model(entry, symptoms)
+            print(f"  Verification: {name} loaded successfully")
         except Exception as e:
-            print(f"  Verification FAILED: {e}")
+            print(f"  Verification FAILED for {name}: {e}")
 
 if __name__ == '__main__':
-    train_models()
+    parser = argparse.ArgumentParser(description='Train the disease prediction models')
+    parser.add_argument('--parallel', action='store_true', help='fit models and CV folds concurrently in a process pool')
+    parser.add_argument('--cv', type=int, default=0, metavar='K', help='also run K-fold cross-validation')
+    parser.add_argument('--workers', type=int, default=None, help='pool size (parallel) or n_jobs (sequential)')
+    parser.add_argument('--refresh-cache', action='store_true', help='re-parse training_data.csv even if a cached copy exists')
+    parser.add_argument('--latency-budget-ms', type=float, default=LATENCY_BUDGET_MS,
+                        help='p95 single-row latency the default model must meet')
+    parser.add_argument('--tune', action='store_true', help='search hyperparameters with successive halving before training')
+    parser.add_argument('--tune-candidates', type=int, default=12, help='hyperparameter sets tried per model')
+    parser.add_argument('--latency-weight', type=float, default=0.002,
+                        help='accuracy given up per ms of single-row latency when scoring candidates')
+    parser.add_argument('--default-params', action='store_true', help='ignore hyperparameters saved in the bundle')
+    parser.add_argument('--update', nargs='+', metavar='FILE',
+                        help='update only naive_bayes in the existing bundle from new CSV/parquet files')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='rows per chunk when streaming --update files')
+    args = parser.parse_args()
+    if args.update:
+        update_naive_bayes(args.update, args.chunk_rows)
+    else:
+        train_models(cv_folds=args.cv, parallel=args.parallel, workers=args.workers, refresh_cache=args.refresh_cache,
+                     latency_budget_ms=args.latency_budget_ms, tune=args.tune, tune_candidates=args.tune_candidates,
+                     latency_weight=args.latency_weight, default_params=args.default_params)
@@ -0,0 +1,209 @@
+"""
+Compact loader for the symptom training set
+training_data.csv is parsed once, in chunks, straight into a uint8 symptom
+matrix (one byte per cell instead of eight) and a label array. Both are cached
+as .npy files keyed on the CSV's content hash, so later runs memory-map the
+cache and skip CSV parsing entirely.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+from model_bundle import file_sha256
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+DATA_DIR = BASE_DIR / 'data'
+TRAINING_FILE = DATA_DIR / 'training_data.csv'
+CACHE_DIR = Path(os.getenv('TRAINING_CACHE_DIR', DATA_DIR / 'cache'))
+
+LABEL_COLUMN = 'prognosis'
+
+# Rows parsed per CSV chunk; bounds parsing memory for very large files
+CHUNK_ROWS = 100_000
+
+class TrainingSet:
+    """Symptom matrix (rows x symptoms, uint8), labels and the symptom column order"""
+
+    def __init__(self, X, y, columns, source_sha256):
+        self.X = X
+        self.y = y
+        self.columns = list(columns)
+        self.source_sha256 = source_sha256
+
+    def __len__(self):
+        return len(self.y)
+
+    def frame(self):
+        """Zero-copy DataFrame view, so fitted models record the symptom column names"""
+        return pd.DataFrame(self.X, columns=self.columns, copy=False)
+
+    def labels(self):
+        return pd.Series(self.y, name=LABEL_COLUMN)
+
+def cache_paths(source_sha256, cache_dir=CACHE_DIR):
+    stem = f"training-{source_sha256[:16]}"
+    return {
+        'X': Path(cache_dir) / f"{stem}.X.npy",
+        'y': Path(cache_dir) / f"{stem}.y.npy",
+        'meta': Path(cache_dir) / f"{stem}.json"
+    }
+
+def read_columns(csv_path):
+    """Symptom columns in file order, skipping the label and trailing-comma artifacts"""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    return [c for c in header if c != LABEL_COLUMN and not c.startswith('Unnamed')]
+
+def count_rows(csv_path):
+    """
+    Lines after the header, counted without parsing the CSV
+    An upper bound on the data rows: pandas skips blank lines and a quoted
+    field may span several lines
+    """
+    with open(csv_path, 'rb') as f:
+        lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1024 * 1024), b''))
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            lines += 1
+    return lines - 1
+
+def parse_csv(csv_path, paths):
+    """Stream the CSV into uint8 .npy files without ever holding it as a DataFrame"""
+    columns = read_columns(csv_path)
+    max_rows = count_rows(csv_path)
+
+    tmp_x = paths['X'].with_name(paths['X'].name + '.tmp')
+    X = open_memmap(tmp_x, mode='w+', dtype=np.uint8, shape=(max_rows, len(columns)))
+    labels = []
+
+    row = 0
+    dtypes = {column: np.uint8 for column in columns}
+    for chunk in pd.read_csv(csv_path, usecols=columns + [LABEL_COLUMN], dtype=dtypes, chunksize=CHUNK_ROWS):
+        X[row:row + len(chunk)] = chunk[columns].to_numpy()
+        labels.append(chunk[LABEL_COLUMN].to_numpy().astype(str))
+        row += len(chunk)
+    X.flush()
+
+    if row < max_rows:
+        # Blank or multi-line rows: keep only the rows actually parsed
+        tmp_trimmed = paths['X'].with_name(paths['X'].name + '.trim.tmp')
+        trimmed = open_memmap(tmp_trimmed, mode='w+', dtype=np.uint8, shape=(row, len(columns)))
+        for start in range(0, row, CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, row)
+            trimmed[start:stop] = X[start:stop]
+        trimmed.flush()
+        del trimmed
+        del X
+        os.replace(tmp_trimmed, tmp_x)
+    else:
+        del X
+
+    y = np.concatenate(labels) if labels else np.empty(0, dtype=str)
+    tmp_y = paths['y'].with_name(paths['y'].name + '.tmp')
+    with open(tmp_y, 'wb') as f:
+        np.save(f, y)
+
+    os.replace(tmp_x, paths['X'])
+    os.replace(tmp_y, paths['y'])
+    return columns
+
+def load_training_data(csv_path=TRAINING_FILE, cache_dir=CACHE_DIR, refresh=False):
+    """
+    Load the training set, parsing the CSV only if its cached form is missing
+    The symptom matrix is memory-mapped read-only, so it can be larger than RAM
+    """
+    source_sha256 = file_sha256(csv_path)
+    paths = cache_paths(source_sha256, cache_dir)
+
+    if refresh or not all(path.exists() for path in paths.values()):
+        print(f"Parsing {csv_path} into a compact cache...")
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        columns = parse_csv(csv_path, paths)
+        # Metadata is written last and marks the cache as complete
+        with open(paths['meta'], 'w') as f:
+            json.dump({'source': str(csv_path), 'source_sha256': source_sha256, 'columns': columns}, f)
+        prune_cache(source_sha256, cache_dir)
+    else:
+        print(f"Using cached training data {paths['X'].name}")
+
+    with open(paths['meta'], 'r') as f:
+        meta = json.load(f)
+    X = np.load(paths['X'], mmap_mode='r')
+    y = np.load(paths['y'])
+    return TrainingSet(X, y, meta['columns'], source_sha256)
+
+def load_folds(data, n_folds, cache_dir=CACHE_DIR, seed=42):
+    """
+    Stratified k-fold test indices for a training set, cached next to its parse
+    Every CV run and tuning round then scores on exactly the same folds
+    """
+    path = Path(cache_dir) / f"training-{data.source_sha256[:16]}.folds-k{n_folds}-s{seed}.npz"
+    if path.exists():
+        with np.load(path) as cached:
+            return [cached[f'fold{i}'] for i in range(n_folds)]
+
+    from sklearn.model_selection import StratifiedKFold
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    folds = [test_idx for _, test_idx in splitter.split(np.zeros(len(data)), data.y)]
+
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **{f'fold{i}': fold for i, fold in enumerate(folds)})
+    os.replace(tmp_path, path)
+    return folds
+
+def read_parquet_batches(path, chunk_rows):
+    """Parquet row batches as DataFrames; needs the optional pyarrow package"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading parquet training data requires pyarrow (pip install pyarrow)")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+def iter_training_chunks(path, columns, chunk_rows=CHUNK_ROWS):
+    """
+    Stream (uint8 symptom frame, labels) chunks from a CSV or parquet file
+    Chunks are aligned to `columns`; symptoms missing from the file are 0, and
+    symptoms the columns don't know about are an error rather than silently dropped
+    """
+    path = Path(path)
+    if path.suffix == '.parquet':
+        chunks = read_parquet_batches(path, chunk_rows)
+    else:
+        header = [c for c in pd.read_csv(path, nrows=0).columns if c != LABEL_COLUMN]
+        dtypes = {column: np.uint8 for column in header if not column.startswith('Unnamed')}
+        chunks = pd.read_csv(path, dtype=dtypes, chunksize=chunk_rows)
+
+    known = set(columns)
+    for chunk in chunks:
+        unknown = [c for c in chunk.columns if c not in known and c != LABEL_COLUMN and not c.startswith('Unnamed')]
+        if unknown:
+            raise ValueError(f"{path.name} has symptoms not in the model: {', '.join(unknown[:5])}")
+        X = chunk.reindex(columns=columns, fill_value=0).astype(np.uint8)
+        yield X, chunk[LABEL_COLUMN].to_numpy().astype(str)
+
+def read_labels(path, chunk_rows=CHUNK_ROWS):
+    """Distinct labels in a CSV or parquet file, read a chunk at a time"""
+    path = Path(path)
+    if path.suffix == '.parquet':
+        chunks = read_parquet_batches(path, chunk_rows)
+    else:
+        chunks = pd.read_csv(path, usecols=[LABEL_COLUMN], chunksize=chunk_rows)
+    labels = set()
+    for chunk in chunks:
+        labels.update(chunk[LABEL_COLUMN].astype(str).unique())
+    return labels
+
+def prune_cache(source_sha256, cache_dir=CACHE_DIR):
+    """Remove cached parses of older versions of the CSV"""
+    keep = {path.name for path in cache_paths(source_sha256, cache_dir).values()}
+    for path in Path(cache_dir).glob('training-*'):
+        if path.name not in keep:
+            path.unlink()
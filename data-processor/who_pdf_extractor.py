@@ -0,0 +1,275 @@
+"""
+Single-pass extraction of the WHO terminology PDFs
+Every page's text is extracted once and all pattern extractors run over it:
+terminology terms (parse_who_terminologies.py), WHO code maps
+(extract_who_mappings.py) and ICD-11 codes (extract_icd11_codes.py).
+Results are cached next to the source files, keyed by the PDF checksum and
+this module's code, so the scripts after the first one don't touch the PDF.
+
+Pages are extracted in a process pool: each document is split into page
+ranges, every worker opens the PDF itself, and the pages of all three
+documents share the pool. PDF_EXTRACT_WORKERS sets its size.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pdfplumber
+
+from fuzzy_matcher import super_normalize, sanskrit_stem
+from model_bundle import file_sha256
+from source_cache import SOURCE_CACHE_DIR, fetch_drive_file
+
+# Google Drive file IDs for WHO PDFs
+WHO_PDF_FILES = {
+    'ayurveda': '12Ee2I8oZosFgtzanPnAklSB0a3r9kVnS',
+    'siddha': '1HedsKD5lSNF88RVjBg6jJjO5vEDlramu',
+    'unani': '1-Wp73wy0pjevQ4goVT3E-vO7a2YFwCEm'
+}
+
+EXTRACTED_DIR = SOURCE_CACHE_DIR / 'extracted'
+
+# Extraction processes (default: all cores); 1 extracts in-process
+PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', '0')) or os.cpu_count() or 1
+
+# Below this many pages in total a process pool costs more than it saves
+PARALLEL_MIN_PAGES = 40
+
+# Terminology lines
+PAGE_NUMBER = re.compile(r'^\d+$')
+TERM_START = re.compile(r'^[A-Z][a-z]+')
+TERM_HEAD = re.compile(r'^([^-:]+)')
+
+# ICD-11 codes: MG26, DD70, DB35, etc. (2 letters + 2-3 digits)
+ICD_PATTERN = re.compile(r'\b([A-Z]{2}\d{2,3}(?:\.\d+)?)\b')
+EDGE_PUNCTUATION = re.compile(r'^\W+|\W+$')
+WHITESPACE = re.compile(r'\s+')
+
+# WHO codes, one format per system
+# Ayurveda: term followed by ITA-xxx code; allows spaces/hyphens in the term part
+AYURVEDA_CODE = re.compile(r'([a-zA-Zāīūṛṝḷḹeaiomanḥśṣṭḍṅñ\s-]+)\s+(ITA-[\d\.]+)')
+# Siddha: multi-word terms before x.x.x code
+SIDDHA_CODE = re.compile(r'([A-Za-z\s\u00C0-\u024F\u1E00-\u1EFF]+?)\s+(\d+\.\d+\.\d+)')
+# Unani: capitalized terms followed by newline and English definition
+UNANI_TERM = re.compile(r'([A-Z][a-z\u00C0-\u024F\u1E00-\u1EFF\s\-\'\']+)\n\s*([A-Za-z\s]+)')
+
+def page_terms(text, system_type):
+    """Terminology entries on one page: a capitalized term, then its description"""
+    terms = []
+    for line in text.split('\n'):
+        line = line.strip()
+
+        # Skip empty lines, headers, page numbers
+        if not line or len(line) < 3:
+            continue
+
+        if PAGE_NUMBER.match(line):
+            continue
+
+        if 'WHO' in line.upper() or 'WORLD HEALTH' in line.upper():
+            continue
+
+        # Term followed by description (term is the part before a dash or colon)
+        if TERM_START.search(line):
+            term_match = TERM_HEAD.match(line)
+            if term_match:
+                term = term_match.group(1).strip()
+                description = line[len(term):].strip(' -:')
+
+                if len(term) > 2 and len(term) < 100:
+                    terms.append({
+                        'term': term,
+                        'description': description if description else term,
+                        'system_type': system_type
+                    })
+    return terms
+
+def page_icd11_codes(text, system_type):
+    """ICD-11 codes on one page, titled with the rest of their line"""
+    codes = []
+    for line in text.split('\n'):
+        for code in ICD_PATTERN.findall(line):
+            # The title is usually on the same line
+            title = line.replace(code, '').strip()
+            title = EDGE_PUNCTUATION.sub('', title)
+            title = WHITESPACE.sub(' ', title)
+
+            if title and len(title) > 3 and len(title) < 200:
+                # Determine module based on context
+                module = 'TM2' if 'traditional' in line.lower() or 'ayurved' in line.lower() else 'Biomedicine'
+                codes.append({
+                    'code': code,
+                    'title': title,
+                    'module': module,
+                    'system_type': system_type
+                })
+    return codes
+
+def page_who_codes(text, system_type):
+    """(normalized term, WHO code or definition) pairs on one page, in page order"""
+    pairs = []
+    if system_type == 'ayurveda':
+        for term, code in AYURVEDA_CODE.findall(text):
+            # Store multiple variations to maximize hits
+            norm = super_normalize(term)
+            stem = sanskrit_stem(term)
+            if norm:
+                pairs.append((norm, code))
+            if stem and stem != norm:
+                pairs.append((stem, code))
+    elif system_type == 'siddha':
+        for term, code in SIDDHA_CODE.findall(text):
+            norm = super_normalize(term)
+            if norm:
+                pairs.append((norm, f"WHO-SID-{code}"))
+    elif system_type == 'unani':
+        for term, english_def in UNANI_TERM.findall(text):
+            norm = super_normalize(term)
+            clean_def = english_def.strip()
+            if norm and clean_def:
+                pairs.append((norm, clean_def))
+    return pairs
+
+def extract_page(text, system_type):
+    """Every extractor's results for one page of text"""
+    if not text:
+        return {'terms': [], 'icd11_codes': [], 'who_codes': []}
+    return {
+        'terms': page_terms(text, system_type),
+        'icd11_codes': page_icd11_codes(text, system_type),
+        'who_codes': page_who_codes(text, system_type)
+    }
+
+def merge_pages(pages):
+    """
+    Combine per-page results in page order
+    Terms keep the first occurrence (case-insensitive), ICD-11 codes the first
+    occurrence of each code, and WHO code maps the last value of each key
+    """
+    terms, seen = [], set()
+    icd11_codes = {}
+    who_mappings = {}
+    for page in pages:
+        for term in page['terms']:
+            if term['term'].lower() not in seen:
+                seen.add(term['term'].lower())
+                terms.append(term)
+        for item in page['icd11_codes']:
+            icd11_codes.setdefault(item['code'], item)
+        for key, value in page['who_codes']:
+            who_mappings[key] = value
+    return {'terms': terms, 'icd11_codes': list(icd11_codes.values()), 'who_mappings': who_mappings}
+
+def extractor_signature():
+    """Changes whenever the extraction code (and so its output) changes"""
+    return hashlib.sha1(Path(__file__).read_bytes()).hexdigest()[:16]
+
+def extract_page_range(pdf_path, system_type, start, stop):
+    """Per-page results for pages [start, stop); opens the PDF itself so it can run in any process"""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [extract_page(pdf.pages[i].extract_text(), system_type) for i in range(start, stop)]
+
+def count_pages(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def plan_page_ranges(page_counts, workers):
+    """(system, start, stop) tasks, about four per worker so uneven pages even out"""
+    total = sum(page_counts.values())
+    size = max(1, -(-total // (workers * 4)))
+    return [
+        (system_type, start, min(start + size, pages))
+        for system_type, pages in page_counts.items()
+        for start in range(0, pages, size)
+    ]
+
+def cache_path(pdf_path, system_type, cache_dir=EXTRACTED_DIR):
+    return Path(cache_dir) / f"{file_sha256(pdf_path)}-{system_type}-{extractor_signature()}.json"
+
+def save_extracted(result, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.extract-', suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def extract_who_pdfs(pdf_paths, workers=PDF_EXTRACT_WORKERS, refresh=False, cache_dir=EXTRACTED_DIR):
+    """
+    Terms, WHO code maps and ICD-11 codes of several WHO PDFs at once:
+    {system: {'terms': [...], 'who_mappings': {...}, 'icd11_codes': [...]}}
+    Page ranges of every document not already cached go into one process pool;
+    each document's pages are merged back in page order. A document that fails
+    is reported and left out of the result.
+    """
+    results = {}
+    paths = {}
+    for system_type, pdf_path in pdf_paths.items():
+        paths[system_type] = cache_path(pdf_path, system_type, cache_dir)
+        if paths[system_type].exists() and not refresh:
+            with open(paths[system_type], 'r', encoding='utf-8') as f:
+                results[system_type] = json.load(f)
+            print(f"Using extracted {system_type} PDF from {paths[system_type].name}")
+
+    page_counts = {}
+    for system_type, pdf_path in pdf_paths.items():
+        if system_type in results:
+            continue
+        try:
+            page_counts[system_type] = count_pages(pdf_path)
+            print(f"Extracting {system_type} PDF ({page_counts[system_type]} pages)...")
+        except Exception as e:
+            print(f"Error opening {system_type} PDF: {e}")
+
+    pages = {system_type: {} for system_type in page_counts}
+    failed = set()
+    tasks = plan_page_ranges(page_counts, workers)
+    if workers == 1 or sum(page_counts.values()) < PARALLEL_MIN_PAGES:
+        for system_type, start, stop in tasks:
+            if system_type in failed:
+                continue
+            try:
+                pages[system_type][start] = extract_page_range(pdf_paths[system_type], system_type, start, stop)
+            except Exception as e:
+                print(f"Error extracting {system_type} pages {start}-{stop}: {e}")
+                failed.add(system_type)
+    elif tasks:
+        print(f"Extracting {len(tasks)} page ranges with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(extract_page_range, pdf_paths[system_type], system_type, start, stop): (system_type, start, stop)
+                for system_type, start, stop in tasks
+            }
+            for future in as_completed(futures):
+                system_type, start, stop = futures[future]
+                try:
+                    pages[system_type][start] = future.result()
+                except Exception as e:
+                    print(f"Error extracting {system_type} pages {start}-{stop}: {e}")
+                    failed.add(system_type)
+
+    for system_type, ranges in pages.items():
+        if system_type in failed:
+            continue
+        ordered = [page for start in sorted(ranges) for page in ranges[start]]
+        results[system_type] = merge_pages(ordered)
+        save_extracted(results[system_type], paths[system_type])
+
+    for system_type, result in results.items():
+        print(f"  {system_type}: {len(result['terms'])} terms, {len(result['who_mappings'])} WHO code mappings, "
+              f"{len(result['icd11_codes'])} ICD-11 codes")
+    return results
+
+def fetch_who_pdfs(files=WHO_PDF_FILES):
+    """{system: local PDF path} for every WHO PDF that could be fetched"""
+    pdf_paths = {}
+    for system_type, file_id in files.items():
+        try:
+            pdf_paths[system_type] = fetch_drive_file(file_id, '.pdf')
+        except Exception as e:
+            print(f"Error fetching {system_type} WHO PDF: {e}")
+    return pdf_paths
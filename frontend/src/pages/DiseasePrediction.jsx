@@ -27,6 +27,7 @@ const DiseasePrediction = () => {
     const [symptoms, setSymptoms] = useState([]);
     const [selectedSymptoms, setSelectedSymptoms] = useState([]);
     const [searchTerm, setSearchTerm] = useState('');
+    const [suggestions, setSuggestions] = useState(null);
     const [models, setModels] = useState({});
     const [selectedModel, setSelectedModel] = useState('random_forest');
     const [prediction, setPrediction] = useState(null);
@@ -72,6 +73,9 @@ const DiseasePrediction = () => {
 
                 setSymptoms(symptomsData.symptoms || []);
                 setModels(modelsData.models || {});
+                if (modelsData.default_model) {
+                    setSelectedModel(modelsData.default_model);
+                }
                 setHistory(historyData.history || []);
             } catch (err) {
                 console.error('Error fetching data:', err);
@@ -84,6 +88,46 @@ const DiseasePrediction = () => {
         fetchData();
     }, [logout]);
 
+    // Ranked suggestions from the ML service as the user types
+    useEffect(() => {
+        let ignore = false;
+
+        const fetchSuggestions = async () => {
+            const query = searchTerm.trim();
+            if (!query) {
+                setSuggestions(null);
+                return;
+            }
+
+            try {
+                const token = localStorage.getItem('accessToken');
+                const response = await fetch(
+                    `http://localhost:5000/api/prediction/symptoms/suggest?q=${encodeURIComponent(query)}&limit=50`,
+                    { headers: token ? { 'Authorization': `Bearer ${token}` } : {} }
+                );
+                if (!response.ok) {
+                    throw new Error(`Suggestions failed with ${response.status}`);
+                }
+                const data = await response.json();
+                if (!ignore) {
+                    setSuggestions((data.suggestions || []).map(s => s.symptom));
+                }
+            } catch (err) {
+                console.error('Symptom suggestion error:', err);
+                // Fall back to filtering the catalogue locally
+                if (!ignore) {
+                    setSuggestions(null);
+                }
+            }
+        };
+
+        const debounce = setTimeout(fetchSuggestions, 300);
+        return () => {
+            ignore = true;
+            clearTimeout(debounce);
+        };
+    }, [searchTerm]);
+
     const handleSymptomToggle = (symptom) => {
         if (selectedSymptoms.includes(symptom)) {
             setSelectedSymptoms(selectedSymptoms.filter(s => s !== symptom));
@@ -151,9 +195,13 @@ const DiseasePrediction = () => {
         }
     };
 
-    const filteredSymptoms = symptoms.filter(s =>
-        s.toLowerCase().includes(searchTerm.toLowerCase())
-    );
+    // The full catalogue is only listed while nothing is typed; until the first
+    // suggestions arrive (or if the service fails) it is filtered locally
+    const filteredSymptoms = !searchTerm.trim()
+        ? symptoms
+        : suggestions || symptoms.filter(s =>
+            s.toLowerCase().includes(searchTerm.toLowerCase())
+        );
 
     const getConfidenceColor = (confidence) => {
         if (confidence >= 0.8) return 'var(--success)';